@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -54,11 +55,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.locale.LocaleMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "newspaper.page_cache.PageCacheMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -106,6 +109,80 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "newspaper",
+    },
+    # Ranked search results, locmem evicts the least recently used entries
+    "search": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "search",
+        "OPTIONS": {"MAX_ENTRIES": 1000},
+    },
+    # Rendered pages for anonymous readers and their surrogate key versions
+    "pages": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "pages",
+        "OPTIONS": {"MAX_ENTRIES": 2000},
+    },
+    # {% cache %} fragments of the layout, keyed by the navigation version
+    "template_fragments": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "template_fragments",
+    },
+}
+
+# Share the caches between the gunicorn workers: REDIS_URL=redis://host:6379
+# (without a database number). Without it every process has its own locmem
+# caches, which is only fine for runserver; `manage.py check` warns about it.
+REDIS_URL = os.environ.get("REDIS_URL", "").rstrip("/")
+if REDIS_URL:
+    # One Redis database per alias, clear() flushes a whole database
+    for number, alias in enumerate(CACHES):
+        CACHES[alias] = {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": f"{REDIS_URL}/{number}",
+        }
+
+# Navigation context is rebuilt on Post/Category/Tag changes, this is only a safety net
+NAVIGATION_CACHE_TIMEOUT = 60 * 60
+
+# Layout fragments only change with the navigation version in their key
+FRAGMENT_CACHE_TIMEOUT = 60 * 60
+
+# The assembled homepage is cached briefly, post changes invalidate it earlier
+HOME_CACHE_TIMEOUT = 60
+
+# Anonymous pages are cached until a change purges one of their surrogate keys,
+# this is only a safety net (e.g. for view counts)
+PAGE_CACHE_TIMEOUT = 60 * 10
+
+# Public post lists use keyset (cursor) pagination on (published_at, id),
+# set to False to fall back to page numbers
+POST_LIST_CURSOR_PAGINATION = True
+POST_LIST_PAGE_SIZE = 1
+
+# Full-text search backend, chosen from the database vendor when not set:
+# newspaper.search.PostgresSearchBackend (tsvector + GIN), SqliteSearchBackend
+# (FTS5) or SimpleSearchBackend (icontains)
+# SEARCH_BACKEND = "newspaper.search.PostgresSearchBackend"
+SEARCH_RESULTS_LIMIT = 500
+SEARCH_CACHE_TIMEOUT = 60 * 10
+# The searches are logged to stderr, or to <LOG_DIR>/search.log when LOG_DIR
+# is set; warm_search_cache reads that file
+LOG_DIR = os.environ.get("LOG_DIR")
+SEARCH_LOG_FILE = Path(LOG_DIR) / "search.log" if LOG_DIR else None
+
+# Post views are buffered in the default cache and written in batches, and by
+# each worker as it exits. With a shared cache (REDIS_URL), run
+# `python manage.py flush_view_counts` from cron to flush idle workers too.
+VIEW_COUNT_FLUSH_INTERVAL = 30  # seconds
+VIEW_COUNT_FLUSH_BATCH_SIZE = 500
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -141,9 +218,29 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/4.1/howto/static-files/
 
 STATIC_URL = "static/"
-STATICFILES_DIRS = ("static", "node_modules")
+STATICFILES_DIRS = ("static",)
 STATIC_ROOT = "static_cdn"
 
+# node_modules is not a static dir: only the files the templates use are
+# collected, see newspaper.staticfiles.VendorFinder
+VENDOR_ROOT = BASE_DIR / "node_modules"
+STATICFILES_FINDERS = [
+    "django.contrib.staticfiles.finders.FileSystemFinder",
+    "django.contrib.staticfiles.finders.AppDirectoriesFinder",
+    "newspaper.staticfiles.VendorFinder",
+]
+
+# collectstatic names the files after their content and writes .gz and .br
+# copies; WhiteNoise serves those with far-future immutable cache headers
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "newspaper.staticfiles.StaticFilesStorage",
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
@@ -152,6 +249,17 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Uploads go through newspaper.views.MediaView, which checks access and then
+# lets the web server send the file: "X-Accel-Redirect" for nginx, with an
+# internal location at MEDIA_SENDFILE_URL aliased to MEDIA_ROOT, or
+# "X-Sendfile" for Apache's mod_xsendfile. None sends the file from Django.
+MEDIA_SENDFILE_HEADER = None
+MEDIA_SENDFILE_URL = "/protected-media/"
+
+# Processes that resize uploaded images into responsive renditions. AVIF
+# renditions are only made when Pillow has an encoder (pillow-avif-plugin).
+IMAGE_RENDITION_WORKERS = 2
+
 # LOGIN_REDIRECT_URL = "admin-post-list"
 # LOGIN_REDIRECT_URL = "news_admin:all-post-list"
 LOGIN_REDIRECT_URL = "admin-post-list"
@@ -180,9 +288,15 @@ MESSAGE_TAGS = {
 SUMMERNOTE_CONFIG = {
     "summernote": {
         "width": "100%",
-    }
+    },
+    # Pasted photos are shrunk on upload, see newspaper.storage
+    "attachment_storage_class": "newspaper.storage.OptimizedImageStorage",
+    "attachment_filesize_limit": 20 * 1024 * 1024,
 }
 
+# Longest side of an image pasted into a post, in pixels
+INLINE_IMAGE_MAX_SIZE = 2048
+
 from datetime import timedelta
 
 SIMPLE_JWT = {
@@ -210,3 +324,30 @@ USE_L10N = True
 LOCALE_PATHS = [
     BASE_DIR / "locale",
 ]
+
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "message": {"format": "%(message)s"},
+    },
+    "handlers": {
+        "search_log": (
+            {
+                "class": "logging.handlers.WatchedFileHandler",
+                "filename": SEARCH_LOG_FILE,
+                "formatter": "message",
+            }
+            if SEARCH_LOG_FILE
+            else {"class": "logging.StreamHandler", "formatter": "message"}
+        ),
+    },
+    "loggers": {
+        "newspaper.search": {
+            "handlers": ["search_log"],
+            "level": "INFO",
+            "propagate": False,
+        },
+    },
+}
@@ -0,0 +1,22 @@
+from django.db.models import Case, When
+from rest_framework.filters import SearchFilter
+
+from newspaper.search import search_post_ids
+
+
+class PostSearchFilter(SearchFilter):
+    """
+    ?search= backed by the full-text search backend instead of icontains.
+    Results keep the relevance order unless the paginator imposes its own.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, "").strip()
+        if not query:
+            return queryset
+
+        post_ids = search_post_ids(query)
+        if not post_ids:
+            return queryset.none()
+        rank = Case(*[When(pk=pk, then=index) for index, pk in enumerate(post_ids)])
+        return queryset.filter(pk__in=post_ids).order_by(rank)
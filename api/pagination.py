@@ -0,0 +1,77 @@
+from rest_framework.pagination import (
+    BasePagination,
+    CursorPagination,
+    PageNumberPagination,
+)
+
+
+class PostCursorPagination(CursorPagination):
+    ordering = ("-published_at", "-id")
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class DraftCursorPagination(PostCursorPagination):
+    # Drafts have no published_at yet
+    ordering = ("-created_at", "-id")
+
+
+class PostPagination(BasePagination):
+    """
+    Page numbers by default, clients opt in to cursor pagination per request
+    with ?pagination=cursor. Cursor pages skip the COUNT(*) and the OFFSET scan,
+    and their next/previous links keep the cursor mode.
+    """
+
+    cursor_pagination_class = PostCursorPagination
+    page_number_pagination_class = PageNumberPagination
+
+    def __init__(self):
+        self.cursor_paginator = self.cursor_pagination_class()
+        self.page_number_paginator = self.page_number_pagination_class()
+        self.paginator = self.page_number_paginator
+
+    def uses_cursor(self, request):
+        return (
+            request.query_params.get("pagination") == "cursor"
+            or self.cursor_paginator.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.uses_cursor(request):
+            self.paginator = self.cursor_paginator
+        else:
+            self.paginator = self.page_number_paginator
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.paginator.get_paginated_response_schema(schema)
+
+    def get_results(self, data):
+        return self.paginator.get_results(data)
+
+    def get_next_link(self):
+        return self.paginator.get_next_link()
+
+    def get_previous_link(self):
+        return self.paginator.get_previous_link()
+
+    @property
+    def display_page_controls(self):
+        return self.paginator.display_page_controls
+
+    def to_html(self):
+        return self.paginator.to_html()
+
+    def get_schema_fields(self, view):
+        return self.page_number_paginator.get_schema_fields(view)
+
+    def get_schema_operation_parameters(self, view):
+        return self.page_number_paginator.get_schema_operation_parameters(view)
+
+
+class DraftPagination(PostPagination):
+    cursor_pagination_class = DraftCursorPagination
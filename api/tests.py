@@ -1,3 +1,35 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
 
-# Create your tests here.
+from newspaper.models import Category, Post
+from newspaper.view_counter import maybe_flush
+
+
+class PostDetailConditionalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.post = Post.objects.create(
+            title="Post",
+            content="<p>Body</p>",
+            author=User.objects.create(username="reporter"),
+            category=Category.objects.create(name="world"),
+            published_at=timezone.now(),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    # Buffered until the flush below, the ETag holds the flushed count
+    @override_settings(VIEW_COUNT_FLUSH_INTERVAL=60 * 60)
+    def test_not_modified_counts_the_view(self):
+        url = f"/api/v1/posts/{self.post.pk}/"
+        etag = self.client.get(url)["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # The ids the requests buffered, as a worker flushes them
+        with override_settings(VIEW_COUNT_FLUSH_INTERVAL=0):
+            maybe_flush()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views_count, 2)
@@ -1,11 +1,11 @@
 from django.contrib.auth.models import Group, User
-from django.db import models
 from django.utils import timezone
 from rest_framework import exceptions, permissions, status, viewsets
-from rest_framework.filters import SearchFilter
 from rest_framework.generics import ListAPIView, RetrieveAPIView
 from rest_framework.response import Response
 
+from api.filters import PostSearchFilter
+from api.pagination import DraftPagination, PostPagination
 from api.serializers import (
     CategorySerializer,
     CommentSerializer,
@@ -17,7 +17,38 @@ from api.serializers import (
     TagSerializer,
     UserSerializer,
 )
+from newspaper.conditional import (
+    not_modified,
+    page_etag,
+    post_validators,
+    set_validators,
+)
 from newspaper.models import Category, Comment, Contact, Newsletter, Post, Tag
+from newspaper.view_counter import record_view
+
+
+class ConditionalListMixin:
+    """
+    ETag for paginated list endpoints, from the posts of the page being served
+    and its links, with no query over the whole collection. A matching request
+    gets a 304 before the page is serialized.
+    """
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        if page is None:
+            return super().list(request, *args, **kwargs)
+        etag = page_etag(
+            page,
+            self.paginator.get_next_link(),
+            self.paginator.get_previous_link(),
+            request.accepted_renderer.format,
+        )
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+        serializer = self.get_serializer(page, many=True)
+        return set_validators(self.get_paginated_response(serializer.data), etag)
 
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -72,17 +103,17 @@ class CategoryViewSet(viewsets.ModelViewSet):
         return super().get_permissions()
 
 
-class PostViewSet(viewsets.ModelViewSet):
+class PostViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows Posts to be viewed or edited.
     """
 
-    queryset = Post.objects.all().order_by("-published_at")
+    queryset = Post.objects.for_display().order_by("-published_at", "-id")
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = PostPagination
 
-    filter_backends = [SearchFilter]
-    search_fields = ["title", "content"]
+    filter_backends = [PostSearchFilter]
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -112,19 +143,29 @@ class PostViewSet(viewsets.ModelViewSet):
     #     return queryset
 
     def retrieve(self, request, *args, **kwargs):
+        validators = post_validators(
+            Post.objects.published(), kwargs["pk"], request.accepted_renderer.format
+        )
+        if validators is not None:
+            response = not_modified(request, *validators)
+            if response is not None:
+                # The router passes the pk as a string, it was checked above
+                record_view(int(kwargs["pk"]))
+                return response
+
         # Get the object instance
         instance = self.get_object()
 
-        # Increment the views_count
-        instance.views_count = models.F("views_count") + 1
-        instance.save(update_fields=["views_count"])  # Use update_fields for efficiency
-
-        # Refresh the instance from the database to ensure the updated value is reflected
-        instance.refresh_from_db()
+        # Increment the buffered views_count, the serialized count includes
+        # the views that are not flushed to the database yet
+        instance.views_count += record_view(instance.pk)
 
         # Serialize and return the data
         serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        response = Response(serializer.data)
+        if validators is not None:
+            set_validators(response, *validators)
+        return response
 
     # def retrieve(self, request, *args, **kwargs):
     #     instance = self.get_object()
@@ -134,14 +175,17 @@ class PostViewSet(viewsets.ModelViewSet):
     #     return Response(serializer.data)
 
 
-class DraftListView(ListAPIView):
-    queryset = Post.objects.all()
+class DraftListView(ConditionalListMixin, ListAPIView):
+    queryset = Post.objects.for_display()
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = DraftPagination
 
     def get_queryset(self):
         queryset = super().get_queryset()
-        queryset = queryset.filter(published_at__isnull=True)
+        queryset = queryset.filter(published_at__isnull=True).order_by(
+            "-created_at", "-id"
+        )
         return queryset
 
 
@@ -151,10 +195,11 @@ class DraftDetailView(RetrieveAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
 
-class PostListByCategoryView(ListAPIView):
-    queryset = Post.objects.all()
+class PostListByCategoryView(ConditionalListMixin, ListAPIView):
+    queryset = Post.objects.for_display()
     serializer_class = PostSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = PostPagination
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -162,14 +207,15 @@ class PostListByCategoryView(ListAPIView):
             status="active",
             published_at__isnull=False,
             category=self.kwargs["category_id"],
-        )
+        ).order_by("-published_at", "-id")
         return queryset
 
 
-class PostListByTagView(ListAPIView):
-    queryset = Post.objects.all()
+class PostListByTagView(ConditionalListMixin, ListAPIView):
+    queryset = Post.objects.for_display()
     serializer_class = PostSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = PostPagination
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -177,7 +223,7 @@ class PostListByTagView(ListAPIView):
             status="active",
             published_at__isnull=False,
             tag=self.kwargs["tag_id"],
-        )
+        ).order_by("-published_at", "-id")
         return queryset
 
 
@@ -344,11 +390,6 @@ class CommentViewSet(APIView):
 #         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-from django.db.models import Case, F, Q, Sum, When
-
-published_and_active = Q(status="active", published_at__isnull=False)
-
-
 class TopCategoriesListViewSet(ListAPIView):
     """
     List all Top categories that has maximum views_count posts
@@ -358,28 +399,10 @@ class TopCategoriesListViewSet(ListAPIView):
     serializer_class = CategorySerializer
 
     def get_queryset(self):
-        top_categories = (
-            Post.objects.filter(published_and_active)
-            .annotate(
-                pk=F("category__pk"),
-                name=F("category__name"),
-                max_views=Sum("views_count"),
-            )
-            .order_by("-views_count")
-            .values("pk", "name", "max_views")
-        )
-        # [2,6,5,6]
-        category_ids = [top_category["pk"] for top_category in top_categories]
-        order_by_max_views = Case(
-            *[
-                When(id=category["pk"], then=category["max_views"])
-                for category in top_categories
-            ]
-        )
-        top_categories = Category.objects.filter(pk__in=category_ids).order_by(
-            -order_by_max_views
+        # Counters kept by newspaper.counters, the ranking is an indexed sort
+        return Category.objects.filter(published_post_count__gt=0).order_by(
+            "-total_views", "pk"
         )
-        return top_categories
 
 
 from rest_framework_simplejwt.views import TokenObtainPairView
@@ -0,0 +1,127 @@
+import random
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+# Hot computed values, such as the navigation and the homepage sections, are
+# kept in two tiers: a small LRU in each process in front of the shared cache.
+# A value is fresh for its jittered timeout and then served stale for a grace
+# period while one process, holding a lock in the shared cache, recomputes it.
+LOCK_KEY = "lock:{}"
+LOCK_TIMEOUT = 30
+WAIT_TIMEOUT = 5
+WAIT_INTERVAL = 0.05
+JITTER = 0.1
+
+# Backends whose entries only exist in the process that wrote them
+PROCESS_LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+
+def is_shared(alias):
+    """Whether every worker process sees the entries of the cache `alias`."""
+    return not isinstance(caches[alias], PROCESS_LOCAL_BACKENDS)
+
+
+class TieredCache:
+    """
+    get_or_compute() in front of the shared cache `alias`. Values in the local
+    tier are shared by the threads of a process, so treat them as read-only.
+    """
+
+    def __init__(self, alias="default", local_size=128):
+        self.alias = alias
+        self.local_size = local_size
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._metrics = Counter()
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def get_or_compute(self, key, compute, timeout, stale_timeout=None):
+        """
+        The value of `key`, calling compute() when it is missing or stale.
+        `stale_timeout` is how long a stale value may be served while it is
+        recomputed, `timeout` by default.
+        """
+        local = self._get_local(key)
+        if local is not None and local["fresh_until"] > time.time():
+            self._count("local_hit")
+            return local["value"]
+
+        shared = self.shared.get(key)
+        if shared is not None:
+            self._set_local(key, shared)
+            if shared["fresh_until"] > time.time():
+                self._count("shared_hit")
+                return shared["value"]
+
+        lock_key = LOCK_KEY.format(key)
+        if self.shared.add(lock_key, 1, LOCK_TIMEOUT):
+            try:
+                return self._recompute(key, compute, timeout, stale_timeout)
+            finally:
+                self.shared.delete(lock_key)
+
+        # Another process is recomputing the value; the local copy still
+        # serves when the shared one expired or was evicted
+        stale = shared if shared is not None else local
+        if stale is not None:
+            self._count("stale_hit")
+            return stale["value"]
+        self._count("miss")
+        deadline = time.monotonic() + WAIT_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(WAIT_INTERVAL)
+            entry = self.shared.get(key)
+            if entry is not None:
+                self._set_local(key, entry)
+                return entry["value"]
+        # The lock holder is too slow or died, compute it here as well
+        return self._recompute(key, compute, timeout, stale_timeout)
+
+    def metrics(self):
+        """Counts of this process: local_hit, shared_hit, stale_hit, miss, recompute."""
+        with self._lock:
+            return dict(self._metrics)
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+    def _recompute(self, key, compute, timeout, stale_timeout):
+        self._count("recompute")
+        value = compute()
+        # Jitter, so that values computed together do not expire together
+        fresh_for = timeout * random.uniform(1 - JITTER, 1 + JITTER)
+        entry = {"value": value, "fresh_until": time.time() + fresh_for}
+        stale_for = timeout if stale_timeout is None else stale_timeout
+        self.shared.set(key, entry, round(fresh_for + stale_for))
+        self._set_local(key, entry)
+        return value
+
+    def _get_local(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None:
+                self._local.move_to_end(key)
+            return entry
+
+    def _set_local(self, key, entry):
+        with self._lock:
+            self._local[key] = entry
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    def _count(self, metric):
+        with self._lock:
+            self._metrics[metric] += 1
+
+
+hot_cache = TieredCache()
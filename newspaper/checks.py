@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+from newspaper.cache import is_shared
+
+
+@register(Tags.caches)
+def check_shared_caches(app_configs, **kwargs):
+    # Invalidations, purges and buffered views only reach the process that
+    # made them when the cache is not shared
+    if settings.DEBUG:
+        return []
+    return [
+        Warning(
+            f"The {alias!r} cache is local to each process, so invalidations "
+            "do not reach the other workers.",
+            hint="Set REDIS_URL to share the caches between the workers.",
+            id="newspaper.W002",
+        )
+        for alias in settings.CACHES
+        if not is_shared(alias)
+    ]
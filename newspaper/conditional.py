@@ -0,0 +1,76 @@
+import hashlib
+from calendar import timegm
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+# ETag and Last-Modified computed from timestamps and counters, so that a
+# conditional GET is answered with 304 before the page or the serializer runs.
+
+
+def make_etag(*parts):
+    digest = hashlib.md5("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def post_validators(queryset, pk, *extra):
+    """
+    (etag, last_modified) of a post from its updated_at, views_count and
+    comments, or None when the post is not in the queryset. `extra` is
+    anything else the response depends on, e.g. the language.
+    """
+    try:
+        queryset = queryset.filter(pk=pk)
+    except (TypeError, ValueError):
+        # Left for the view to answer with 404
+        return None
+    # One row, so Max() of the post's own columns is just their value
+    watermarks = queryset.aggregate(
+        updated_at=Max("updated_at"),
+        views_count=Max("views_count"),
+        comment_count=Count("comment"),
+        last_comment_at=Max("comment__updated_at"),
+    )
+    if watermarks["updated_at"] is None:
+        return None
+    last_modified = max(
+        filter(None, [watermarks["updated_at"], watermarks["last_comment_at"]])
+    )
+    return make_etag(*watermarks.values(), *extra), last_modified
+
+
+def page_etag(posts, *extra):
+    """
+    ETag of a page of posts from their ids, updated_at and counters, so that
+    it costs nothing beyond fetching the page. No Last-Modified: a page can
+    change to older posts, e.g. when one is unpublished.
+    """
+    rows = [
+        (post.pk, post.updated_at, post.views_count, post.comment_count)
+        for post in posts
+    ]
+    return make_etag(*rows, *extra)
+
+
+def not_modified(request, etag, last_modified=None):
+    # A 304 (or 412) response when the request's validators match, else None
+    if last_modified is not None:
+        last_modified = timegm(last_modified.utctimetuple())
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None and response.status_code == 304:
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified=None):
+    if response.status_code != 200:
+        return response
+    response.headers.setdefault("ETag", etag)
+    if last_modified is not None:
+        response.headers.setdefault(
+            "Last-Modified", http_date(timegm(last_modified.utctimetuple()))
+        )
+    return response
@@ -0,0 +1,138 @@
+import html
+import math
+import re
+
+import bleach
+from bleach.css_sanitizer import CSSSanitizer
+from django.conf import settings
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+from newspaper.images import RENDITION_DIRS, is_rendition, picture_sources, srcset
+
+# Fields of Post derived from its content by process_content()
+CONTENT_FIELDS = ("content_html", "plain_text", "excerpt", "word_count", "reading_time")
+
+EXCERPT_LENGTH = 300
+WORDS_PER_MINUTE = 200
+
+# What the Summernote toolbar can produce
+ALLOWED_TAGS = {
+    "a",
+    "b",
+    "blockquote",
+    "br",
+    "code",
+    "div",
+    "em",
+    "font",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "h5",
+    "h6",
+    "hr",
+    "i",
+    "iframe",
+    "img",
+    "li",
+    "ol",
+    "p",
+    "pre",
+    "span",
+    "strike",
+    "strong",
+    "sub",
+    "sup",
+    "table",
+    "tbody",
+    "td",
+    "th",
+    "thead",
+    "tr",
+    "u",
+    "ul",
+}
+ALLOWED_ATTRIBUTES = {
+    "*": ["class", "style"],
+    "a": ["href", "title", "target", "rel"],
+    "font": ["color", "face", "size"],
+    "iframe": ["src", "width", "height", "frameborder", "allowfullscreen"],
+    "img": ["src", "alt", "title", "width", "height"],
+    "td": ["colspan", "rowspan"],
+    "th": ["colspan", "rowspan"],
+}
+css_sanitizer = CSSSanitizer()
+
+# Sanitizing keeps the text of stripped tags, which for these is code
+SCRIPT_RE = re.compile(r"<(script|style)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+
+# Tags that end a line of text, so that strip_tags does not glue words together
+BLOCK_END_RE = re.compile(
+    r"<br\s*/?>|</(?:p|div|li|h[1-6]|blockquote|pre|tr|table)>", re.IGNORECASE
+)
+
+
+IMG_RE = re.compile(r"<img\b([^>]*?)\s*/?>", re.IGNORECASE)
+SRC_RE = re.compile(r'\ssrc="([^"]*)"')
+INLINE_IMAGE_SIZES = "(max-width: 991px) 100vw, 730px"
+RESIZABLE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def responsive_img(match):
+    attrs = match.group(1)
+    src = SRC_RE.search(attrs)
+    name = html.unescape(src.group(1)) if src else ""
+    if name.startswith(settings.MEDIA_URL):
+        name = name[len(settings.MEDIA_URL) :]
+    lazy = ' loading="lazy" decoding="async"'
+    if (
+        not name.startswith(RENDITION_DIRS)
+        or not name.lower().endswith(RESIZABLE_EXTENSIONS)
+        or is_rendition(name)
+    ):
+        # External, animated or already resized, only load it lazily
+        return f"<img{attrs}{lazy}>"
+    return (
+        f"<picture>{picture_sources(name, INLINE_IMAGE_SIZES)}"
+        f'<img{attrs} srcset="{srcset(name, "jpg")}" sizes="{INLINE_IMAGE_SIZES}"'
+        f"{lazy}></picture>"
+    )
+
+
+def sanitize_html(content):
+    clean = bleach.clean(
+        content,
+        tags=ALLOWED_TAGS,
+        attributes=ALLOWED_ATTRIBUTES,
+        css_sanitizer=css_sanitizer,
+        strip=True,
+    )
+    # Uploaded images get the renditions made by newspaper.images
+    clean = IMG_RE.sub(responsive_img, clean)
+    # The detail page used to render the body through linebreaksbr
+    return clean.replace("\r\n", "\n").replace("\n", "<br>")
+
+
+def html_to_text(content):
+    text = html.unescape(strip_tags(BLOCK_END_RE.sub("\n", content)))
+    lines = (" ".join(line.split()) for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def process_content(content):
+    """
+    Everything the templates, the PDF report and the search index read instead
+    of parsing the raw Summernote HTML on every request.
+    """
+    content = SCRIPT_RE.sub("", content)
+    plain_text = html_to_text(content)
+    word_count = len(plain_text.split())
+    return {
+        "content_html": sanitize_html(content),
+        "plain_text": plain_text,
+        "excerpt": Truncator(" ".join(plain_text.split())).chars(EXCERPT_LENGTH),
+        "word_count": word_count,
+        "reading_time": math.ceil(word_count / WORDS_PER_MINUTE),
+    }
@@ -0,0 +1,156 @@
+from collections import Counter
+
+from django.db.models import Case, Count, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from newspaper.models import Category, Comment, Post, Tag
+
+# Denormalized counters: Category and Tag keep published_post_count and
+# total_views, the views of their published posts, and Post keeps
+# comment_count. They are moved by the signals in newspaper.signals and by the
+# view count flush, in the same transaction as the change; reconcile() repairs
+# any drift.
+LISTING_FIELDS = ("status", "published_at", "category_id", "views_count")
+
+PostTag = Post.tag.through
+
+
+def add(model, field, deltas):
+    """field += delta for every {pk: delta}, in one UPDATE."""
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    model.objects.filter(pk__in=deltas).update(
+        **{
+            field: F(field)
+            + Case(*[When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()])
+        }
+    )
+
+
+def listing(post, stored=None, update_fields=None):
+    """What the counters depend on, as saved: fields left out keep `stored`."""
+    saved = {field: getattr(post, field) for field in LISTING_FIELDS}
+    if stored and update_fields:
+        for field in LISTING_FIELDS:
+            if (
+                field not in update_fields
+                and field.removesuffix("_id") not in update_fields
+            ):
+                saved[field] = stored[field]
+    return saved
+
+
+def contribution(listing):
+    # (posts, views) a post adds to its category and each of its tags
+    if listing and listing["status"] == "active" and listing["published_at"]:
+        return 1, listing["views_count"]
+    return 0, 0
+
+
+def move_post(post_id, old_listing, new_listing):
+    """Update the counters of a post that was saved or deleted (new_listing=None)."""
+    old_posts, old_views = contribution(old_listing)
+    new_posts, new_views = contribution(new_listing)
+    old_category = old_listing and old_listing["category_id"]
+    new_category = new_listing and new_listing["category_id"]
+    if (old_posts, old_views, old_category) == (new_posts, new_views, new_category):
+        return
+
+    posts, views = Counter(), Counter()
+    posts[old_category] -= old_posts
+    views[old_category] -= old_views
+    posts[new_category] += new_posts
+    views[new_category] += new_views
+    add(Category, "published_post_count", posts)
+    add(Category, "total_views", views)
+
+    tag_ids = PostTag.objects.filter(post_id=post_id).values_list("tag_id", flat=True)
+    add(Tag, "published_post_count", {pk: new_posts - old_posts for pk in tag_ids})
+    add(Tag, "total_views", {pk: new_views - old_views for pk in tag_ids})
+
+
+def move_tags(pairs, sign):
+    """Count (sign=1) or uncount (sign=-1) (post_id, tag_id) pairs."""
+    views = dict(
+        Post.objects.published()
+        .filter(pk__in={post_id for post_id, _ in pairs})
+        .values_list("pk", "views_count")
+    )
+    posts, tag_views = Counter(), Counter()
+    for post_id, tag_id in pairs:
+        if post_id in views:
+            posts[tag_id] += sign
+            tag_views[tag_id] += sign * views[post_id]
+    add(Tag, "published_post_count", posts)
+    add(Tag, "total_views", tag_views)
+
+
+def add_views(deltas):
+    """Add the {post_id: views} written by the view count flush."""
+    categories = dict(
+        Post.objects.published().filter(pk__in=deltas).values_list("pk", "category_id")
+    )
+    # Only the published posts count, whatever else the caller passed
+    views = {pk: delta for pk, delta in deltas.items() if pk in categories}
+    category_views, tag_views = Counter(), Counter()
+    for post_id, delta in views.items():
+        category_views[categories[post_id]] += delta
+    for post_id, tag_id in PostTag.objects.filter(post_id__in=views).values_list(
+        "post_id", "tag_id"
+    ):
+        tag_views[tag_id] += views[post_id]
+    add(Category, "total_views", category_views)
+    add(Tag, "total_views", tag_views)
+
+
+def _sum(queryset, group_by, expression):
+    # A correlated subquery of one aggregate per row of the outer table
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{group_by: OuterRef("pk")})
+            .order_by()
+            .values(group_by)
+            .annotate(total=expression)
+            .values("total")
+        ),
+        0,
+    )
+
+
+def reconcile():
+    """Recompute every counter and return how many had drifted, per model."""
+    published = Post.objects.published()
+    post_tags = PostTag.objects.filter(
+        post__status="active", post__published_at__isnull=False
+    )
+    expected = [
+        (
+            Category,
+            {
+                "published_post_count": _sum(published, "category", Count("pk")),
+                "total_views": _sum(published, "category", Sum("views_count")),
+            },
+        ),
+        (
+            Tag,
+            {
+                "published_post_count": _sum(post_tags, "tag", Count("pk")),
+                "total_views": _sum(post_tags, "tag", Sum("post__views_count")),
+            },
+        ),
+        (
+            Post,
+            {"comment_count": _sum(Comment.objects.all(), "post", Count("pk"))},
+        ),
+    ]
+
+    fixed = {}
+    for model, counters in expected:
+        fixed[model._meta.model_name] = 0
+        for field, expression in counters.items():
+            drifted = model.objects.annotate(expected=expression).exclude(
+                **{field: F("expected")}
+            )
+            fixed[model._meta.model_name] += drifted.update(**{field: expression})
+    return fixed
@@ -0,0 +1,57 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.translation import get_language
+
+from newspaper.cache import hot_cache
+from newspaper.models import Post
+
+HOME_VERSION_KEY = "home:version"
+
+# The homepage sections all come from the newest posts:
+# posts => 5, featured post => 1, featured posts => 3 after it, recent posts => 7
+HOME_RECENT_POSTS = 7
+HOME_WEEKLY_POSTS = 7
+
+
+def invalidate_home():
+    try:
+        cache.incr(HOME_VERSION_KEY)
+    except ValueError:
+        cache.set(HOME_VERSION_KEY, 1, None)
+
+
+def build_home_context():
+    published = (
+        Post.objects.published().for_listing().select_related("category", "author")
+    )
+
+    # One bounded fetch for every section that shows the newest posts
+    recent_posts = list(
+        published.order_by("-published_at", "-views_count")[:HOME_RECENT_POSTS]
+    )
+
+    one_week_ago = timezone.now() - timedelta(days=7)
+    weekly_top_posts = list(
+        published.filter(published_at__gte=one_week_ago).order_by(
+            "-views_count", "-published_at"
+        )[:HOME_WEEKLY_POSTS]
+    )
+
+    return {
+        "posts": recent_posts[:5],
+        "featured_post": recent_posts[0] if recent_posts else None,
+        "featured_posts": recent_posts[1:4],
+        "weekly_top_posts": weekly_top_posts,
+        "recent_posts": recent_posts,
+    }
+
+
+def get_home_context():
+    version = cache.get_or_set(HOME_VERSION_KEY, 1, None)
+    key = f"home:{version}:{get_language()}"
+    return hot_cache.get_or_compute(
+        key, build_home_context, settings.HOME_CACHE_TIMEOUT
+    )
@@ -0,0 +1,256 @@
+import base64
+import io
+import logging
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from django.utils.html import format_html, format_html_join
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+try:
+    # Registers an AVIF encoder with Pillow releases that lack one
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
+
+logger = logging.getLogger(__name__)
+
+# Renditions are stored next to the original:
+# blobs/3a/7b/3a7b...e1.jpg => blobs/3a/7b/3a7b...e1.320w.webp
+RENDITION_WIDTHS = (160, 320, 640, 1024)
+RENDITION_DIRS = ("blobs", "post_images", "user_images", "django-summernote")
+PLACEHOLDER_SIZE = 16
+RENDITION_RE = re.compile(r"^(?P<stem>.+)\.(?P<width>\d+)w\.(?P<ext>[a-z]+)$")
+
+# extension => (Pillow format, content type, save options), best format first
+FORMATS = {
+    "avif": ("AVIF", "image/avif", {"quality": 55}),
+    "webp": ("WEBP", "image/webp", {"quality": 80, "method": 4}),
+    "jpg": (
+        "JPEG",
+        "image/jpeg",
+        {"quality": 82, "optimize": True, "progressive": True},
+    ),
+}
+
+Image.init()
+RENDITION_FORMATS = [ext for ext, (fmt, *_) in FORMATS.items() if fmt in Image.SAVE]
+
+
+def rendition_name(name, width, ext):
+    stem = name.rsplit(".", 1)[0]
+    return f"{stem}.{width}w.{ext}"
+
+
+def is_rendition(name):
+    match = RENDITION_RE.match(name)
+    return bool(match) and match["ext"] in FORMATS
+
+
+def find_original(name, storage=default_storage):
+    """The uploaded file a rendition name was made from, or None."""
+    match = RENDITION_RE.match(name)
+    if not match or not name.startswith(RENDITION_DIRS):
+        return None
+    if (
+        int(match["width"]) not in RENDITION_WIDTHS
+        or match["ext"] not in RENDITION_FORMATS
+    ):
+        return None
+    directory, _, stem = match["stem"].rpartition("/")
+    _, files = storage.listdir(directory)
+    for filename in files:
+        if filename.rsplit(".", 1)[0] == stem and not is_rendition(filename):
+            return f"{directory}/{filename}"
+    return None
+
+
+def srcset(name, ext):
+    return ", ".join(
+        f"{default_storage.url(rendition_name(name, width, ext))} {width}w"
+        for width in RENDITION_WIDTHS
+    )
+
+
+def picture_sources(name, sizes):
+    # <source> elements for the formats better than the JPEG <img> fallback
+    return format_html_join(
+        "",
+        '<source type="{}" srcset="{}" sizes="{}">',
+        (
+            (FORMATS[ext][1], srcset(name, ext), sizes)
+            for ext in RENDITION_FORMATS
+            if ext != "jpg"
+        ),
+    )
+
+
+def has_renditions(name, storage=default_storage):
+    # The smallest JPEG is written last, see generate_renditions()
+    return storage.exists(rendition_name(name, RENDITION_WIDTHS[0], "jpg"))
+
+
+def resize(image, width):
+    # Never upscale, a small original is re-encoded at its own size
+    if width >= image.width:
+        return image
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.LANCZOS)
+
+
+def encode(image, ext):
+    fmt, _, options = FORMATS[ext]
+    if fmt == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    elif image.mode not in ("RGB", "RGBA", "L"):
+        image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+    buffer = io.BytesIO()
+    # No exif or icc_profile is passed on, so the metadata is dropped
+    image.save(buffer, fmt, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def optimize_image(file, max_size):
+    """
+    Re-encode an uploaded image without its metadata, no larger than max_size
+    on either side. Returns (extension, ContentFile), or None for files that
+    are left as they are: non-images and animations.
+    """
+    try:
+        image = Image.open(file)
+        image.load()
+    except (UnidentifiedImageError, OSError):
+        return None
+    finally:
+        file.seek(0)
+    if getattr(image, "is_animated", False):
+        return None
+
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_size, max_size), Image.LANCZOS)
+    if image.mode in ("RGBA", "LA", "P") and (
+        image.mode != "P" or "transparency" in image.info
+    ):
+        buffer = io.BytesIO()
+        image.save(buffer, "PNG", optimize=True)
+        return "png", ContentFile(buffer.getvalue())
+    return "jpg", encode(image, "jpg")
+
+
+def open_image(name):
+    with default_storage.open(name) as original:
+        with Image.open(original) as image:
+            image = ImageOps.exif_transpose(image)
+            image.load()
+    return image
+
+
+def make_placeholder(image):
+    """A micro-thumbnail as a data: URI of a few hundred bytes, shown blurred."""
+    thumbnail = image.copy()
+    thumbnail.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    ext = "webp" if "webp" in RENDITION_FORMATS else "jpg"
+    data = base64.b64encode(encode(thumbnail, ext).read()).decode()
+    return f"data:{FORMATS[ext][1]};base64,{data}"
+
+
+def generate_renditions(
+    name, widths=RENDITION_WIDTHS, formats=None, force=False, image=None
+):
+    """Write the missing renditions of an uploaded image and return their names."""
+    storage = default_storage
+    formats = formats or RENDITION_FORMATS
+    if image is None:
+        image = open_image(name)
+
+    created = []
+    # Largest first, so has_renditions() only holds once all are written
+    for width in sorted(widths, reverse=True):
+        resized = resize(image, width)
+        for ext in formats:
+            target = rendition_name(name, width, ext)
+            if storage.exists(target):
+                if not force:
+                    continue
+                storage.delete(target)
+            storage.save(target, encode(resized, ext))
+            created.append(target)
+    return created
+
+
+_pool = None
+
+
+def make_pool(max_workers=None):
+    # spawn, so that workers do not inherit the web process's connections
+    return ProcessPoolExecutor(
+        max_workers=max_workers or settings.IMAGE_RENDITION_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=django.setup,
+    )
+
+
+def _log_failure(future):
+    if future.exception() is not None:
+        logger.error("Processing an image failed", exc_info=future.exception())
+
+
+def process_featured_image(post_id, name, force=False):
+    """
+    Renditions, size and placeholder of a post's featured image. Runs in the
+    pool, where Django is set up by the time the models are imported.
+    """
+    from newspaper.home import invalidate_home
+    from newspaper.models import Post
+    from newspaper.navigation import invalidate_navigation
+    from newspaper.page_cache import purge
+
+    image = open_image(name)
+    generate_renditions(name, force=force, image=image)
+    # The post may have a newer image by now
+    updated = Post.objects.filter(pk=post_id, featured_image=name).update(
+        featured_image_width=image.width,
+        featured_image_height=image.height,
+        featured_image_placeholder=make_placeholder(image),
+        # A new ETag for the post
+        updated_at=timezone.now(),
+    )
+    if updated:
+        # update() sends no post_save, the cached pages with the image are
+        # dropped here instead
+        purge(f"post:{post_id}")
+        invalidate_navigation()
+        invalidate_home()
+
+
+def schedule(function, *args):
+    global _pool
+    if _pool is None:
+        _pool = make_pool()
+    try:
+        future = _pool.submit(function, *args)
+    except RuntimeError:
+        # The pool is broken or shut down, the next upload starts a new one
+        logger.exception("Cannot schedule %s%r", function.__name__, args)
+        _pool = None
+        return None
+    future.add_done_callback(_log_failure)
+    return future
+
+
+def schedule_renditions(name):
+    """
+    Generate the renditions of a new upload in the background. Renditions that
+    are requested before they exist are generated by the rendition view.
+    """
+    return schedule(generate_renditions, name)
+
+
+def schedule_featured_image(post_id, name):
+    return schedule(process_featured_image, post_id, name)
@@ -0,0 +1,66 @@
+import statistics
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.cache import SessionStore
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from newspaper.models import Category, Post
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the rendering of the public pages with an empty and with a warm "
+        "template fragment cache."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="Number of renders of each page in each mode.",
+        )
+
+    def handle(self, *args, **options):
+        post = Post.objects.published().first()
+        category = Category.objects.first()
+        paths = [reverse("home"), reverse("post-list")]
+        if category is not None:
+            paths.append(reverse("post-by-category", args=[category.pk]))
+        if post is not None:
+            paths.append(reverse("post-detail", args=[post.pk]))
+
+        fragments = caches["template_fragments"]
+        self.stdout.write(f"{'page':<40} {'mode':<8} {'median ms':>10} {'queries':>8}")
+        for path in paths:
+            for mode in ("cold", "warm"):
+                timings = []
+                for _ in range(options["repeat"]):
+                    if mode == "cold":
+                        fragments.clear()
+                    timings.append(self.render(path))
+                median = statistics.median(elapsed for elapsed, _ in timings)
+                queries = timings[-1][1]
+                self.stdout.write(
+                    f"{path:<40} {mode:<8} {median * 1000:>10.2f} {queries:>8}"
+                )
+
+    def render(self, path):
+        # The view and its template, without the middleware and page cache
+        request = RequestFactory().get(path, HTTP_X_CACHE_WARM="1")
+        request.user = AnonymousUser()
+        request.session = SessionStore()
+        match = resolve(path)
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = match.func(request, *match.args, **match.kwargs)
+            if hasattr(response, "render"):
+                response.render()
+            elapsed = time.perf_counter() - start
+        return elapsed, len(queries)
@@ -0,0 +1,95 @@
+import re
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django_summernote.utils import get_attachment_model
+
+from newspaper.home import invalidate_home
+from newspaper.images import FORMATS, RENDITION_WIDTHS, rendition_name
+from newspaper.models import Post, UserProfile
+from newspaper.navigation import invalidate_navigation
+from newspaper.page_cache import get_page_cache
+from newspaper.storage import BLOB_DIR, blob_storage
+
+MEDIA_SRC_RE = re.compile(rf'src="{re.escape(settings.MEDIA_URL)}([^"]+)"')
+
+
+class Command(BaseCommand):
+    help = (
+        "Move the uploaded files into the content-addressed storage, keeping "
+        "one copy of identical files, and point the posts, profiles and "
+        "editor attachments at them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--keep-originals",
+            action="store_true",
+            help="Leave the old files and their renditions in place.",
+        )
+
+    def handle(self, *args, **options):
+        self.moved = {}
+        self.missing = set()
+
+        for model, field in (
+            (Post, "featured_image"),
+            (UserProfile, "image"),
+            (get_attachment_model(), "file"),
+        ):
+            rows = model.objects.exclude(**{f"{field}__startswith": BLOB_DIR})
+            for pk, name in rows.exclude(**{field: ""}).values_list("pk", field):
+                blob = self.move(name)
+                if blob is not None:
+                    model.objects.filter(pk=pk).update(**{field: blob})
+
+        # Images pasted into posts are linked from the content
+        for post in Post.objects.filter(content__contains=settings.MEDIA_URL):
+            content = MEDIA_SRC_RE.sub(self.replace_src, post.content)
+            if content != post.content:
+                post.content = content
+                # Also rebuilds content_html and purges the post's pages
+                post.save(update_fields=["content"])
+
+        if not options["keep_originals"]:
+            for name in self.moved:
+                self.delete(name)
+
+        # Cached pages and posts link to the old names
+        get_page_cache().clear()
+        invalidate_navigation()
+        invalidate_home()
+
+        blobs = set(self.moved.values())
+        for name in sorted(self.missing):
+            self.stderr.write(f"{name} does not exist.")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Successfully moved {len(self.moved)} files into {len(blobs)} blobs. "
+                "Run generate_renditions to make their renditions."
+            )
+        )
+
+    def move(self, name):
+        if name.startswith(BLOB_DIR) or name in self.missing:
+            return None
+        if name not in self.moved:
+            if not default_storage.exists(name):
+                self.missing.add(name)
+                return None
+            with default_storage.open(name) as original:
+                self.moved[name] = blob_storage.save(name, original)
+        return self.moved[name]
+
+    def replace_src(self, match):
+        blob = self.move(match.group(1))
+        if blob is None:
+            return match.group(0)
+        return f'src="{blob_storage.url(blob)}"'
+
+    def delete(self, name):
+        default_storage.delete(name)
+        for width in RENDITION_WIDTHS:
+            for ext in FORMATS:
+                default_storage.delete(rendition_name(name, width, ext))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from newspaper.cache import is_shared
+from newspaper.view_counter import flush_views
+
+
+class Command(BaseCommand):
+    help = "Write buffered post views to the database."
+
+    def handle(self, *args, **kwargs):
+        if not is_shared("default"):
+            self.stderr.write(
+                self.style.WARNING(
+                    "The default cache is local to each process: this only "
+                    "flushes the views counted by this command, set REDIS_URL."
+                )
+            )
+        flushed = flush_views()
+        self.stdout.write(self.style.SUCCESS(f"Flushed {flushed} buffered views."))
@@ -0,0 +1,48 @@
+from concurrent.futures import as_completed
+
+from django.core.management.base import BaseCommand
+
+from newspaper.images import make_pool, process_featured_image
+from newspaper.models import Post
+
+
+class Command(BaseCommand):
+    help = "Compute the size and placeholder of the featured images already uploaded."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Number of worker processes, IMAGE_RENDITION_WORKERS by default.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Also redo posts that have a placeholder and their renditions.",
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(featured_image="")
+        if not options["force"]:
+            posts = posts.filter(featured_image_placeholder="")
+        posts = list(posts.values_list("pk", "featured_image"))
+
+        failed = 0
+        with make_pool(options["workers"]) as pool:
+            futures = {
+                pool.submit(process_featured_image, pk, name, options["force"]): name
+                for pk, name in posts
+            }
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as error:
+                    failed += 1
+                    self.stderr.write(f"{futures[future]}: {error}")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Successfully processed {len(posts) - failed} of {len(posts)} images."
+            )
+        )
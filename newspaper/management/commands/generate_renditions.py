@@ -0,0 +1,69 @@
+from concurrent.futures import as_completed
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from newspaper.images import (
+    RENDITION_DIRS,
+    generate_renditions,
+    has_renditions,
+    is_rendition,
+    make_pool,
+)
+
+
+def find_images(directory):
+    if not default_storage.exists(directory):
+        return
+    directories, files = default_storage.listdir(directory)
+    extensions = Image.registered_extensions()
+    for filename in files:
+        extension = "." + filename.rsplit(".", 1)[-1].lower()
+        if extension in extensions and not is_rendition(filename):
+            yield f"{directory}/{filename}"
+    for subdirectory in directories:
+        yield from find_images(f"{directory}/{subdirectory}")
+
+
+class Command(BaseCommand):
+    help = "Generate the responsive renditions of the images already uploaded."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Number of worker processes, IMAGE_RENDITION_WORKERS by default.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Regenerate renditions that already exist.",
+        )
+
+    def handle(self, *args, **options):
+        names = [
+            name
+            for directory in RENDITION_DIRS
+            for name in find_images(directory)
+            if options["force"] or not has_renditions(name)
+        ]
+
+        created = 0
+        with make_pool(options["workers"]) as pool:
+            futures = {
+                pool.submit(generate_renditions, name, force=options["force"]): name
+                for name in names
+            }
+            for future in as_completed(futures):
+                try:
+                    created += len(future.result())
+                except Exception as error:
+                    self.stderr.write(f"{futures[future]}: {error}")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Successfully generated {created} renditions of {len(names)} images."
+            )
+        )
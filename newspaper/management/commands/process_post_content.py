@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from newspaper.content import process_content
+from newspaper.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the sanitized HTML, plain text, excerpt and reading time of "
+        "every post, e.g. after the content processing changed."
+    )
+
+    def handle(self, *args, **kwargs):
+        count = 0
+        for post in Post.objects.only("content").iterator():
+            # update() skips the signals, nothing else about the post changed
+            Post.objects.filter(pk=post.pk).update(**process_content(post.content))
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Successfully processed {count} posts."))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from newspaper.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of posts."
+
+    def handle(self, *args, **kwargs):
+        backend = get_search_backend()
+        backend.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Successfully rebuilt the search index with {type(backend).__name__}."
+            )
+        )
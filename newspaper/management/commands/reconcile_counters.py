@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from newspaper.counters import reconcile
+from newspaper.home import invalidate_home
+from newspaper.navigation import invalidate_navigation
+from newspaper.page_cache import get_page_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the post, view and comment counters of the categories, tags "
+        "and posts, and repair those that drifted."
+    )
+
+    def handle(self, *args, **options):
+        fixed = reconcile()
+        for name, count in fixed.items():
+            self.stdout.write(f"{name}: {count} counters repaired")
+
+        if any(fixed.values()):
+            # The sidebars and rankings show the counters
+            get_page_cache().clear()
+            invalidate_navigation()
+            invalidate_home()
+        self.stdout.write(self.style.SUCCESS("Counters are up to date."))
@@ -0,0 +1,154 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from newspaper.cache import is_shared
+from newspaper.models import Category, Post, Tag
+from newspaper.pagination import paginate_by_cursor
+
+# What a render fills: the page, the layout fragments and the navigation
+WARMED_CACHES = ("pages", "template_fragments", "default")
+
+
+def list_paths(path, queryset, pages):
+    """The first `pages` pages of a post list, as the list view paginates it."""
+    yield path
+    if not settings.POST_LIST_CURSOR_PAGINATION:
+        count = queryset.count()
+        last = min(pages, -(-count // settings.POST_LIST_PAGE_SIZE))
+        yield from (f"{path}?page={number}" for number in range(2, last + 1))
+        return
+    queryset = queryset.only("id", "published_at")
+    cursor = None
+    for _ in range(pages - 1):
+        page = paginate_by_cursor(queryset, cursor, settings.POST_LIST_PAGE_SIZE)
+        if not page.has_next():
+            break
+        cursor = page.next_cursor
+        yield f"{path}?cursor={cursor}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the homepage, the first pages of the post, category and tag "
+        "lists and the most read posts in every language, so that a deploy "
+        "starts with warm caches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--pages",
+            type=int,
+            default=3,
+            help="Number of pages of each list to render.",
+        )
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=50,
+            help="Number of most read posts to render.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Number of pages rendered at the same time.",
+        )
+        parser.add_argument(
+            "--host",
+            default=next(
+                (host for host in settings.ALLOWED_HOSTS if host[0] not in ".*"),
+                "localhost",
+            ),
+            help="Host the readers use, it is part of the page cache key.",
+        )
+        parser.add_argument(
+            "--secure",
+            action="store_true",
+            help="Render the pages as requested over HTTPS.",
+        )
+
+    def handle(self, *args, **options):
+        local = [alias for alias in WARMED_CACHES if not is_shared(alias)]
+        if local:
+            # They would be warmed in this process and dropped when it exits
+            raise CommandError(
+                f"The {', '.join(local)} caches are local to each process, "
+                "set REDIS_URL to share them with the workers."
+            )
+
+        published = Post.objects.published()
+        paths = [reverse("home")]
+        paths += list_paths(reverse("post-list"), published, options["pages"])
+        for category in Category.objects.all():
+            paths += list_paths(
+                reverse("post-by-category", args=[category.pk]),
+                published.filter(category=category),
+                options["pages"],
+            )
+        for tag in Tag.objects.all():
+            paths += list_paths(
+                reverse("post-by-tag", args=[tag.pk]),
+                published.filter(tag=tag),
+                options["pages"],
+            )
+        top_posts = published.order_by("-views_count")[: options["top"]]
+        paths += [
+            reverse("post-detail", args=[pk])
+            for pk in top_posts.values_list("pk", flat=True)
+        ]
+
+        requests = [
+            (language, path) for language, _ in settings.LANGUAGES for path in paths
+        ]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+            results = list(
+                pool.map(lambda request: self.render(*request, options), requests)
+            )
+        elapsed = time.perf_counter() - start
+
+        failed = 0
+        for language, path, status, seconds, cache in results:
+            line = f"{language:<6} {status} {seconds * 1000:>8.1f} ms {cache:<5} {path}"
+            if status != 200:
+                failed += 1
+                self.stderr.write(line)
+            else:
+                self.stdout.write(line)
+
+        slowest = sorted(results, key=lambda result: result[3], reverse=True)[:5]
+        self.stdout.write("Slowest:")
+        for language, path, _, seconds, _ in slowest:
+            self.stdout.write(f"  {seconds * 1000:>8.1f} ms {language} {path}")
+        style = self.style.SUCCESS if not failed else self.style.WARNING
+        self.stdout.write(
+            style(
+                f"Warmed {len(results) - failed} of {len(results)} pages "
+                f"in {elapsed:.1f}s with {options['workers']} workers."
+            )
+        )
+
+    def render(self, language, path, options):
+        # In process, through the middleware and the page cache, as a reader
+        # without cookies; X-Cache-Warm keeps the views from being counted
+        client = Client(HTTP_HOST=options["host"])
+        try:
+            start = time.perf_counter()
+            response = client.get(
+                path,
+                secure=options["secure"],
+                HTTP_ACCEPT_LANGUAGE=language,
+                HTTP_X_CACHE_WARM="1",
+            )
+            seconds = time.perf_counter() - start
+        finally:
+            # Every thread has its own database connection
+            connection.close()
+        cache = response.get("X-Cache", "-")
+        return language, path, response.status_code, seconds, cache
@@ -0,0 +1,59 @@
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import translation
+
+from newspaper.cache import is_shared
+from newspaper.search import search_post_ids
+
+
+class Command(BaseCommand):
+    help = "Pre-compute the cached results of the most popular searches from the search log."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--log",
+            default=settings.SEARCH_LOG_FILE,
+            help="Search log to read, one '<language>\\t<query>' per line, "
+            "<LOG_DIR>/search.log by default.",
+        )
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=200,
+            help="Number of most frequent queries to warm.",
+        )
+
+    def handle(self, *args, **options):
+        if not is_shared("search"):
+            # The results would be cached in this process and dropped on exit
+            raise CommandError(
+                "The search cache is local to each process, set REDIS_URL to "
+                "share it with the workers."
+            )
+        if not options["log"]:
+            raise CommandError("Set LOG_DIR or pass --log.")
+
+        popular = Counter()
+        try:
+            with open(options["log"], encoding="utf-8") as log:
+                for line in log:
+                    language, _, query = line.rstrip("\n").partition("\t")
+                    if query:
+                        popular[(language, query)] += 1
+        except FileNotFoundError:
+            raise CommandError(f"Search log {options['log']} does not exist.")
+
+        for (language, query), count in popular.most_common(options["top"]):
+            with translation.override(language):
+                post_ids = search_post_ids(query, log=False)
+            self.stdout.write(
+                f"{language} {query!r}: {len(post_ids)} results ({count} searches)"
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Successfully warmed {min(len(popular), options['top'])} searches."
+            )
+        )
@@ -0,0 +1,132 @@
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from newspaper.images import RENDITION_RE
+from newspaper.models import Post
+
+# Uploads are served by MediaView so that access can be checked; the bytes are
+# sent by the web server when MEDIA_SENDFILE_HEADER is set, else by Django.
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+
+def is_unpublished_image(name):
+    """Whether the image, or the original of a rendition, only belongs to drafts."""
+    match = RENDITION_RE.match(name)
+    if match:
+        images = Post.objects.filter(featured_image__startswith=f"{match['stem']}.")
+    else:
+        images = Post.objects.filter(featured_image=name)
+    return images.exists() and not images.published().exists()
+
+
+def parse_range(header, size):
+    """
+    (first, last) byte of a single range, None when the whole file is sent
+    instead (no or several ranges), or False when the range is past the end.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        # A suffix: the last N bytes
+        length = int(last)
+        return (max(0, size - length), size - 1) if length else False
+    first, last = int(first), int(last) if last else size - 1
+    if first >= size:
+        return False
+    if last < first:
+        return None
+    return first, min(last, size - 1)
+
+
+def read_range(file, first, last):
+    remaining = last - first + 1
+    try:
+        file.seek(first)
+        while remaining > 0:
+            chunk = file.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def sendfile_response(path, name, content_type):
+    # The web server sends the file, including ranges and conditional requests
+    response = HttpResponse(content_type=content_type)
+    header = settings.MEDIA_SENDFILE_HEADER
+    if header == "X-Accel-Redirect":
+        response[header] = settings.MEDIA_SENDFILE_URL + quote(name)
+    else:
+        response[header] = path
+    return response
+
+
+def range_response(request, path, size, content_type, validators):
+    byte_range = None
+    if_range = request.META.get("HTTP_IF_RANGE")
+    # A range of an older version of the file is no use, send all of it
+    if "HTTP_RANGE" in request.META and (if_range is None or if_range in validators):
+        byte_range = parse_range(request.META["HTTP_RANGE"], size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+    elif byte_range is None:
+        # FileResponse lets the WSGI server use sendfile()
+        response = FileResponse(open(path, "rb"), content_type=content_type)
+    else:
+        first, last = byte_range
+        response = StreamingHttpResponse(
+            read_range(open(path, "rb"), first, last),
+            status=206,
+            content_type=content_type,
+        )
+        response["Content-Length"] = last - first + 1
+        response["Content-Range"] = f"bytes {first}-{last}/{size}"
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+def serve_file(request, storage, name, etag=None, content_type=None):
+    """
+    A response with the stored file, answering conditional and range requests.
+    The ETag defaults to one made from the file's mtime and size.
+    """
+    path = storage.path(name)
+    try:
+        stats = os.stat(path)
+    except FileNotFoundError:
+        raise Http404("No such file")
+    if not stat.S_ISREG(stats.st_mode):
+        raise Http404("No such file")
+
+    mtime = int(stats.st_mtime)
+    etag = etag or f'"{mtime:x}-{stats.st_size:x}"'
+    response = get_conditional_response(request, etag=etag, last_modified=mtime)
+    if response is None:
+        content_type = (
+            content_type or mimetypes.guess_type(name)[0] or "application/octet-stream"
+        )
+        if settings.MEDIA_SENDFILE_HEADER:
+            response = sendfile_response(path, name, content_type)
+        else:
+            validators = (etag, http_date(mtime))
+            response = range_response(
+                request, path, stats.st_size, content_type, validators
+            )
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(mtime)
+    return response
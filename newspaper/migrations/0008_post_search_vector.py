@@ -0,0 +1,64 @@
+# Generated by Django 4.2.3 on 2026-10-17 00:19
+
+import django.contrib.postgres.search
+from django.db import migrations
+from django.utils.html import strip_tags
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX newspaper_post_search_vector_gin "
+            "ON newspaper_post USING gin (search_vector)"
+        )
+        schema_editor.execute(
+            "UPDATE newspaper_post SET search_vector = "
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(content, '')), 'B')"
+        )
+    elif vendor == "sqlite":
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE newspaper_post_fts "
+            "USING fts5(title, body, tokenize='porter unicode61')"
+        )
+        Post = apps.get_model("newspaper", "Post")
+        for post in Post.objects.only("title", "content").iterator():
+            schema_editor.execute(
+                "INSERT INTO newspaper_post_fts (rowid, title, body) VALUES (%s, %s, %s)",
+                [post.pk, post.title, strip_tags(post.content)],
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS newspaper_post_search_vector_gin")
+    elif vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS newspaper_post_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("newspaper", "0007_alter_newsletter_email"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="category",
+            options={"ordering": ["name"]},
+        ),
+        migrations.AlterModelOptions(
+            name="contact",
+            options={"ordering": ["created_at"]},
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.3 on 2026-10-17 00:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("newspaper", "0008_post_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                condition=models.Q(
+                    ("published_at__isnull", False), ("status", "active")
+                ),
+                fields=["-published_at", "-id"],
+                name="post_published_feed_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                condition=models.Q(
+                    ("published_at__isnull", False), ("status", "active")
+                ),
+                fields=["category", "-published_at", "-id"],
+                name="post_category_feed_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                condition=models.Q(
+                    ("published_at__isnull", False), ("status", "active")
+                ),
+                fields=["-views_count"],
+                name="post_trending_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                condition=models.Q(("published_at__isnull", True)),
+                fields=["-created_at"],
+                name="post_draft_idx",
+            ),
+        ),
+    ]
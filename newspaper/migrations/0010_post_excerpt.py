@@ -0,0 +1,29 @@
+# Generated by Django 4.2.3 on 2026-10-17 00:23
+
+from django.db import migrations, models
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+
+def fill_excerpts(apps, schema_editor):
+    Post = apps.get_model("newspaper", "Post")
+    posts = Post.objects.only("content")
+    for post in posts.iterator():
+        post.excerpt = Truncator(strip_tags(post.content)).chars(300)
+        post.save(update_fields=["excerpt"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("newspaper", "0009_post_published_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="excerpt",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(fill_excerpts, migrations.RunPython.noop),
+    ]
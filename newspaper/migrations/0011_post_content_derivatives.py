@@ -0,0 +1,108 @@
+# Generated by Django 4.2.3 on 2026-10-17 00:24
+
+import html
+import math
+import re
+
+import bleach
+from bleach.css_sanitizer import CSSSanitizer
+from django.db import migrations, models
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+# A frozen copy of newspaper.content.process_content as of this migration, so
+# that what it writes does not change with the live code
+
+ALLOWED_TAGS = {
+    *("a", "b", "blockquote", "br", "code", "div", "em", "font", "hr", "i"),
+    *("h1", "h2", "h3", "h4", "h5", "h6", "iframe", "img", "li", "ol", "p"),
+    *("pre", "span", "strike", "strong", "sub", "sup", "table", "tbody", "td"),
+    *("th", "thead", "tr", "u", "ul"),
+}
+ALLOWED_ATTRIBUTES = {
+    "*": ["class", "style"],
+    "a": ["href", "title", "target", "rel"],
+    "font": ["color", "face", "size"],
+    "iframe": ["src", "width", "height", "frameborder", "allowfullscreen"],
+    "img": ["src", "alt", "title", "width", "height"],
+    "td": ["colspan", "rowspan"],
+    "th": ["colspan", "rowspan"],
+}
+SCRIPT_RE = re.compile(r"<(script|style)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+BLOCK_END_RE = re.compile(
+    r"<br\s*/?>|</(?:p|div|li|h[1-6]|blockquote|pre|tr|table)>", re.IGNORECASE
+)
+
+
+def process_content(content):
+    content = SCRIPT_RE.sub("", content)
+    text = html.unescape(strip_tags(BLOCK_END_RE.sub("\n", content)))
+    lines = (" ".join(line.split()) for line in text.splitlines())
+    plain_text = "\n".join(line for line in lines if line)
+    content_html = bleach.clean(
+        content,
+        tags=ALLOWED_TAGS,
+        attributes=ALLOWED_ATTRIBUTES,
+        css_sanitizer=CSSSanitizer(),
+        strip=True,
+    )
+    word_count = len(plain_text.split())
+    return {
+        "content_html": content_html.replace("\r\n", "\n").replace("\n", "<br>"),
+        "plain_text": plain_text,
+        "excerpt": Truncator(" ".join(plain_text.split())).chars(300),
+        "word_count": word_count,
+        "reading_time": math.ceil(word_count / 200),
+    }
+
+
+def process_posts(apps, schema_editor):
+    Post = apps.get_model("newspaper", "Post")
+    for post in Post.objects.only("content").iterator():
+        Post.objects.filter(pk=post.pk).update(**process_content(post.content))
+
+    # Index the plain text instead of the raw HTML
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(
+            "UPDATE newspaper_post SET search_vector = "
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(plain_text, '')), 'B')"
+        )
+    elif vendor == "sqlite":
+        schema_editor.execute("DELETE FROM newspaper_post_fts")
+        schema_editor.execute(
+            "INSERT INTO newspaper_post_fts (rowid, title, body) "
+            "SELECT id, title, plain_text FROM newspaper_post"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("newspaper", "0010_post_excerpt"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="content_html",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="plain_text",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="reading_time",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="word_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(process_posts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.3 on 2026-10-17 00:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("newspaper", "0011_post_content_derivatives"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="featured_image_height",
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="featured_image_placeholder",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="featured_image_width",
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.3 on 2026-10-17 00:36
+
+from django.db import migrations, models
+import newspaper.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("newspaper", "0012_post_featured_image_placeholder"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="post",
+            name="featured_image",
+            field=models.ImageField(
+                storage=newspaper.storage.ContentAddressedStorage(), upload_to=""
+            ),
+        ),
+        migrations.AlterField(
+            model_name="userprofile",
+            name="image",
+            field=models.ImageField(
+                storage=newspaper.storage.ContentAddressedStorage(), upload_to=""
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.3 on 2026-10-17 00:38
+
+from django.db import migrations, models
+import newspaper.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("newspaper", "0013_blob_storage"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="post",
+            name="featured_image",
+            field=models.ImageField(
+                db_index=True,
+                storage=newspaper.storage.ContentAddressedStorage(),
+                upload_to="",
+            ),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.3 on 2026-10-17 00:53
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def count(apps, schema_editor):
+    Category = apps.get_model("newspaper", "Category")
+    Tag = apps.get_model("newspaper", "Tag")
+    Post = apps.get_model("newspaper", "Post")
+
+    published = Q(post__status="active", post__published_at__isnull=False)
+    for model in (Category, Tag):
+        counted = model.objects.annotate(
+            posts=Count("post", filter=published),
+            views=Sum("post__views_count", filter=published),
+        )
+        for row in counted.values("pk", "posts", "views"):
+            model.objects.filter(pk=row["pk"]).update(
+                published_post_count=row["posts"], total_views=row["views"] or 0
+            )
+
+    counted = Post.objects.annotate(comments=Count("comment")).filter(comments__gt=0)
+    for row in counted.values("pk", "comments"):
+        Post.objects.filter(pk=row["pk"]).update(comment_count=row["comments"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("newspaper", "0014_post_featured_image_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="published_post_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="category",
+            name="total_views",
+            field=models.PositiveBigIntegerField(
+                db_index=True, default=0, editable=False
+            ),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="comment_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="tag",
+            name="published_post_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="tag",
+            name="total_views",
+            field=models.PositiveBigIntegerField(
+                db_index=True, default=0, editable=False
+            ),
+        ),
+        migrations.RunPython(count, migrations.RunPython.noop),
+    ]
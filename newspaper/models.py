@@ -1,4 +1,14 @@
+import warnings
+from functools import cached_property
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import F, OuterRef, Q, Subquery, Window
+from django.db.models.functions import RowNumber
+
+from newspaper.content import CONTENT_FIELDS, process_content
+from newspaper.storage import blob_storage
 
 
 class TimeStampModel(models.Model):
@@ -11,6 +21,11 @@ class TimeStampModel(models.Model):
 
 class Category(TimeStampModel):
     name = models.CharField(max_length=100)
+    # Counters of the published posts, see newspaper.counters
+    published_post_count = models.PositiveIntegerField(default=0, editable=False)
+    total_views = models.PositiveBigIntegerField(
+        default=0, editable=False, db_index=True
+    )
 
     def __str__(self):
         return self.name
@@ -21,11 +36,116 @@ class Category(TimeStampModel):
 
 class Tag(TimeStampModel):
     name = models.CharField(max_length=100)
+    # Counters of the published posts, see newspaper.counters
+    published_post_count = models.PositiveIntegerField(default=0, editable=False)
+    total_views = models.PositiveBigIntegerField(
+        default=0, editable=False, db_index=True
+    )
 
     def __str__(self):
         return self.name
 
 
+# What the previous and next links of a post render
+NEIGHBOUR_FIELDS = (
+    "id",
+    "title",
+    "featured_image",
+    "featured_image_width",
+    "featured_image_height",
+    "featured_image_placeholder",
+)
+
+NEIGHBOURS = ("previous", "next")
+
+# Large columns that list pages never render
+BODY_FIELDS = ("content", "content_html", "plain_text", "search_vector")
+
+
+class DeferredBodyWarning(RuntimeWarning):
+    """A post body deferred by PostQuerySet.for_listing() was loaded lazily."""
+
+
+class PostQuerySet(models.QuerySet):
+    def published(self):
+        return self.filter(published_at__isnull=False, status="active")
+
+    def for_display(self):
+        """
+        Everything the post templates and serializers touch: author and profile,
+        category and tags, in a fixed number of queries whatever the page size.
+        """
+        return self.select_related(
+            "author", "author__userprofile", "category"
+        ).prefetch_related("tag")
+
+    def for_listing(self):
+        # Teasers come from Post.excerpt, so the bodies are left in the database
+        return self.defer(*BODY_FIELDS)
+
+    def top_per_category(self, category_ids, limit):
+        # ROW_NUMBER() OVER (PARTITION BY category_id ORDER BY published_at DESC)
+        # keeps the newest `limit` posts of every category in a single query
+        return (
+            self.published()
+            .filter(category__in=category_ids)
+            .annotate(
+                category_rank=Window(
+                    expression=RowNumber(),
+                    partition_by=F("category_id"),
+                    order_by=[F("published_at").desc(), F("id").desc()],
+                )
+            )
+            .filter(category_rank__lte=limit)
+            .select_related("category")
+            .order_by("category_id", "category_rank")
+        )
+
+    def with_neighbours(self):
+        """
+        Annotate previous_id and next_id, the older and newer published posts,
+        so that they come with the post; Post.previous_post and next_post load
+        both in one query. The published_at bound lets each LIMIT 1 subquery
+        seek on the feed index, which the OR alone would not.
+        """
+        published = self.model.objects.published()
+        older = (
+            published.filter(published_at__lte=OuterRef("published_at"))
+            .filter(
+                Q(published_at__lt=OuterRef("published_at"))
+                | Q(published_at=OuterRef("published_at"), id__lt=OuterRef("id"))
+            )
+            .order_by("-published_at", "-id")
+        )
+        newer = (
+            published.filter(published_at__gte=OuterRef("published_at"))
+            .filter(
+                Q(published_at__gt=OuterRef("published_at"))
+                | Q(published_at=OuterRef("published_at"), id__gt=OuterRef("id"))
+            )
+            .order_by("published_at", "id")
+        )
+        return self.annotate(
+            previous_id=Subquery(older.values("id")[:1]),
+            next_id=Subquery(newer.values("id")[:1]),
+        )
+
+
+def prefetch_top_posts(categories, limit=4, to_attr="top_posts"):
+    """
+    Attach the newest `limit` published posts to every category as a list,
+    e.g. category.top_posts, using one windowed query for all of them.
+    """
+    categories = list(categories)
+    posts_by_category = {category.pk: [] for category in categories}
+    posts = Post.objects.for_listing().top_per_category(posts_by_category, limit)
+    for post in posts:
+        posts_by_category[post.category_id].append(post)
+    for category in categories:
+        setattr(category, to_attr, posts_by_category[category.pk])
+    return categories
+
+
 class Post(TimeStampModel):
     STATUS_CHOICES = [
         ("active", "Active"),
@@ -33,17 +153,109 @@ class Post(TimeStampModel):
     ]
     title = models.CharField(max_length=200)
     content = models.TextField()
-    featured_image = models.ImageField(upload_to="post_images/%Y/%m/%d", blank=False)
+    # Derived from content on save by newspaper.content.process_content
+    content_html = models.TextField(blank=True, editable=False)
+    plain_text = models.TextField(blank=True, editable=False)
+    excerpt = models.TextField(blank=True, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    reading_time = models.PositiveSmallIntegerField(default=0, editable=False)
+    # Indexed for the draft check of newspaper.media
+    featured_image = models.ImageField(storage=blob_storage, blank=False, db_index=True)
+    # Set in the background by newspaper.images.process_featured_image
+    featured_image_width = models.PositiveIntegerField(null=True, editable=False)
+    featured_image_height = models.PositiveIntegerField(null=True, editable=False)
+    featured_image_placeholder = models.TextField(blank=True, editable=False)
     author = models.ForeignKey("auth.User", on_delete=models.CASCADE)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="active")
     views_count = models.PositiveBigIntegerField(default=0)
+    # Kept up to date by newspaper.counters
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
     published_at = models.DateTimeField(null=True, blank=True)
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
     tag = models.ManyToManyField(Tag)
+    # Maintained by newspaper.search.PostgresSearchBackend
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        # Partial indexes only hold the published and active posts that the
+        # public pages filter on, in the order those pages read them
+        indexes = [
+            models.Index(
+                fields=["-published_at", "-id"],
+                condition=models.Q(status="active", published_at__isnull=False),
+                name="post_published_feed_idx",
+            ),
+            models.Index(
+                fields=["category", "-published_at", "-id"],
+                condition=models.Q(status="active", published_at__isnull=False),
+                name="post_category_feed_idx",
+            ),
+            models.Index(
+                fields=["-views_count"],
+                condition=models.Q(status="active", published_at__isnull=False),
+                name="post_trending_idx",
+            ),
+            models.Index(
+                fields=["-created_at"],
+                condition=models.Q(published_at__isnull=True),
+                name="post_draft_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        if self.featured_image and not self.featured_image._committed:
+            # A new upload, the details of the old image no longer apply
+            self.featured_image_width = self.featured_image_height = None
+            self.featured_image_placeholder = ""
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None:
+            processed = "content" not in self.get_deferred_fields()
+        else:
+            # e.g. save(update_fields=["status"]) leaves the body alone
+            processed = "content" in update_fields
+        if processed:
+            for field, value in process_content(self.content).items():
+                setattr(self, field, value)
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, *CONTENT_FIELDS}
+        super().save(*args, **kwargs)
+
+    def refresh_from_db(self, using=None, fields=None):
+        # A deferred body loaded lazily costs a query per post on list pages
+        if fields:
+            loaded = set(fields) & set(BODY_FIELDS) & self.get_deferred_fields()
+            if loaded:
+                message = (
+                    f"Post {self.pk} loaded deferred {', '.join(sorted(loaded))}; "
+                    "listings should render post.excerpt instead."
+                )
+                # An error while developing and in the tests, a warning in
+                # production
+                if settings.DEBUG:
+                    raise DeferredBodyWarning(message)
+                warnings.warn(message, DeferredBodyWarning, stacklevel=3)
+        super().refresh_from_db(using=using, fields=fields)
+
+    @cached_property
+    def _neighbours(self):
+        # Only set on posts loaded through PostQuerySet.with_neighbours()
+        ids = [getattr(self, f"{direction}_id", None) for direction in NEIGHBOURS]
+        posts = Post.objects.only(*NEIGHBOUR_FIELDS).in_bulk(filter(None, ids))
+        return dict(zip(NEIGHBOURS, map(posts.get, ids)))
+
+    @property
+    def previous_post(self):
+        return self._neighbours["previous"]
+
+    @property
+    def next_post(self):
+        return self._neighbours["next"]
+
     # Fat model and thin views
     @property
     def latest_comments(self):
@@ -81,7 +293,7 @@ class Contact(TimeStampModel):
 
 class UserProfile(TimeStampModel):
     user = models.OneToOneField("auth.User", on_delete=models.CASCADE)
-    image = models.ImageField(upload_to="user_images/%Y/%m/%d", blank=False)
+    image = models.ImageField(storage=blob_storage, blank=False)
     address = models.CharField(max_length=200)
     biography = models.TextField()
 
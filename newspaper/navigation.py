@@ -1,20 +1,37 @@
-from django.db.models import Sum
-from django.db.models.functions import Coalesce
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import get_language
 
-from newspaper.models import Category, Post, Tag
+from newspaper.cache import hot_cache
+from newspaper.models import Category, Post, Tag, prefetch_top_posts
+from newspaper.page_cache import add_surrogate_keys
 
+NAVIGATION_VERSION_KEY = "navigation:version"
 
-def navigation(request):
+
+def get_navigation_version():
+    # Every cached navigation context is keyed by this version, so bumping it
+    # invalidates all languages at once without knowing their keys.
+    return cache.get_or_set(NAVIGATION_VERSION_KEY, 1, None)
+
+
+def invalidate_navigation():
+    try:
+        cache.incr(NAVIGATION_VERSION_KEY)
+    except ValueError:
+        cache.set(NAVIGATION_VERSION_KEY, 1, None)
+
+
+def build_navigation():
     categories = Category.objects.all()
     tags = Tag.objects.all()[:10]
-    # Calculate total views per category and get top categories directly
-    categories_with_views = Category.objects.annotate(
-        total_views=Coalesce(Sum("post__views_count"), 0)
-    ).order_by("-total_views")
+    # total_views is a counter kept by newspaper.counters, not an aggregate
+    categories_with_views = list(Category.objects.order_by("-total_views", "pk")[:4])
 
     # print(categories_with_views.query)
 
-    whats_new_categories = categories_with_views[:4]
+    # The "What's New" tabs show the latest posts of each category
+    whats_new_categories = prefetch_top_posts(categories_with_views[:4], limit=4)
     top_categories = categories_with_views[:3]
 
     # Print results (optional)
@@ -25,22 +42,40 @@ def navigation(request):
     #     {"pk": 5, "name": "technology", "total_views": 8},
     # ]
 
-    trending_posts = Post.objects.filter(
-        published_at__isnull=False, status="active"
-    ).order_by("-views_count")[:3]
+    trending_posts = Post.objects.published().for_listing().order_by("-views_count")[:3]
 
+    # Querysets are evaluated here so that the cached value holds rows, not SQL
     return {
-        "categories": categories,
-        "tags": tags,
-        "trending_posts": trending_posts,
+        "categories": list(categories),
+        "tags": list(tags),
+        "trending_posts": list(trending_posts),
         "top_categories": top_categories,
         "whats_new_categories": whats_new_categories,
     }
 
 
+def navigation(request):
+    version = get_navigation_version()
+    key = f"navigation:{version}:{get_language()}"
+    context = hot_cache.get_or_compute(
+        key, build_navigation, settings.NAVIGATION_CACHE_TIMEOUT
+    )
+
+    post_ids = {post.pk for post in context["trending_posts"]}
+    for category in context["whats_new_categories"]:
+        post_ids.update(post.pk for post in category.top_posts)
+    add_surrogate_keys(request, "nav", *(f"post:{pk}" for pk in post_ids))
+    # The layout's {% cache %} fragments are keyed by the version too
+    return {
+        **context,
+        "nav_version": version,
+        "fragment_cache_timeout": settings.FRAGMENT_CACHE_TIMEOUT,
+    }
+
+
 # from django.db.models import Case, F, Sum, When
 
-# from newspaper.models import Category, Post, Tag
+# from newspaper.models import Category, Post, Tag, prefetch_top_posts
 
 # def navigation(request):
 #     categories = Category.objects.all()
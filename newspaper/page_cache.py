@@ -0,0 +1,182 @@
+import hashlib
+import re
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from django.utils.translation import get_language
+
+from newspaper.cache import is_shared
+
+# Whole rendered pages for anonymous readers. A page is tagged with surrogate
+# keys such as post:<id>, category:<id>, tag:<id>, posts and nav. Every key has
+# a random version; a cached page stores the versions it was rendered with and
+# purging a key gives it a new version, which orphans all pages tagged with it.
+PAGE_KEY = "page:{}:{}"
+SURROGATE_KEY = "surrogate:{}"
+
+# The CSRF token is per visitor: it is cut out of the stored page and a fresh
+# token is punched back in on every hit
+CSRF_PLACEHOLDER = b"__csrf_token_placeholder__"
+CSRF_INPUT_RE = re.compile(rb'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+
+
+def get_page_cache():
+    return caches["pages"]
+
+
+def key_versions(keys):
+    cache = get_page_cache()
+    version_keys = {SURROGATE_KEY.format(key): key for key in keys}
+    found = cache.get_many(version_keys)
+    versions = {}
+    for version_key, key in version_keys.items():
+        if version_key not in found:
+            # add() so that concurrent renders agree on the first version
+            cache.add(version_key, uuid.uuid4().hex, None)
+            found[version_key] = cache.get(version_key)
+        versions[key] = found[version_key]
+    return versions
+
+
+def tag_page(request, *keys):
+    """Opt the page into the page cache and tag it with surrogate keys."""
+    if not hasattr(request, "surrogate_keys"):
+        request.surrogate_keys = {}
+    # Versions are read as soon as the view knows its keys rather than when
+    # the page is stored, so a purge while the page renders is not lost
+    request.surrogate_keys.update(key_versions(keys))
+
+
+def add_surrogate_keys(request, *keys):
+    # For parts shared by every page, e.g. the navigation; only pages opted
+    # in with tag_page() are cached
+    if hasattr(request, "surrogate_keys"):
+        request.surrogate_keys.update(key_versions(keys))
+
+
+def is_warming(request):
+    # Requests of manage.py warm_caches (and benchmark_templates) are not readers
+    return "HTTP_X_CACHE_WARM" in request.META
+
+
+def count_view_on_hit(request, post_id):
+    # Cache hits never reach the view, so the page cache counts the view
+    request.page_view_post_id = post_id
+
+
+def post_keys(posts):
+    return [f"post:{post.pk}" for post in posts]
+
+
+class PageCacheListMixin:
+    """Cache a list view, tagged with its posts and get_page_keys()."""
+
+    page_keys = ["posts"]
+
+    def get_page_keys(self):
+        return self.page_keys
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        tag_page(
+            self.request, *self.get_page_keys(), *post_keys(context["object_list"])
+        )
+        return context
+
+
+def purge(*keys):
+    get_page_cache().set_many(
+        {SURROGATE_KEY.format(key): uuid.uuid4().hex for key in keys}, None
+    )
+
+
+class PageCacheMiddleware:
+    """
+    Serve tagged pages to anonymous GET and HEAD requests from the cache, per
+    language and URL, until one of their surrogate keys is purged or
+    PAGE_CACHE_TIMEOUT passes. Must come after AuthenticationMiddleware and
+    CsrfViewMiddleware.
+    """
+
+    def __init__(self, get_response):
+        # A purge only reaches the cache of the process that made it, other
+        # workers would keep serving edited and unpublished posts
+        if not settings.DEBUG and not is_shared("pages"):
+            raise MiddlewareNotUsed("The pages cache is not shared, see REDIS_URL.")
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method not in ("GET", "HEAD") or request.user.is_authenticated:
+            return self.get_response(request)
+
+        cache = get_page_cache()
+        digest = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+        key = PAGE_KEY.format(get_language(), digest)
+        entry = cache.get(key)
+        if entry is not None and key_versions(entry["keys"]) == entry["keys"]:
+            return self.cached_response(request, entry)
+
+        response = self.get_response(request)
+        if self.should_store(request, response):
+            cache.set(
+                key, self.make_entry(request, response), settings.PAGE_CACHE_TIMEOUT
+            )
+            response["X-Cache"] = "MISS"
+            response["Surrogate-Key"] = " ".join(sorted(request.surrogate_keys))
+        return response
+
+    def should_store(self, request, response):
+        return (
+            hasattr(request, "surrogate_keys")
+            and response.status_code == 200
+            and not response.streaming
+            # e.g. messages stored in a cookie belong to this visitor only
+            and not response.cookies
+        )
+
+    def make_entry(self, request, response):
+        return {
+            "content": CSRF_INPUT_RE.sub(
+                rb"\g<1>" + CSRF_PLACEHOLDER + rb"\g<2>", response.content
+            ),
+            "status": response.status_code,
+            "headers": dict(response.items()),
+            "keys": request.surrogate_keys,
+            "post_id": getattr(request, "page_view_post_id", None),
+        }
+
+    def cached_response(self, request, entry):
+        headers = entry["headers"]
+        # The validators the view set on the stored page still hold for it
+        response = get_conditional_response(
+            request,
+            etag=headers.get("ETag"),
+            last_modified=parse_http_date_safe(headers.get("Last-Modified", "")),
+        )
+        if response is None:
+            content = entry["content"]
+            if CSRF_PLACEHOLDER in content:
+                # get_token() also makes CsrfViewMiddleware set the cookie
+                token = get_token(request).encode()
+                content = content.replace(CSRF_PLACEHOLDER, token)
+            response = HttpResponse(content, status=entry["status"])
+            for header, value in headers.items():
+                response[header] = value
+        else:
+            for header in ("ETag", "Last-Modified"):
+                if header in headers:
+                    response[header] = headers[header]
+        response["X-Cache"] = "HIT"
+        response["Surrogate-Key"] = " ".join(sorted(entry["keys"]))
+        if entry["post_id"] is not None and not is_warming(request):
+            # Imported here, the view counter depends on the navigation
+            from newspaper.view_counter import record_view
+
+            record_view(entry["post_id"])
+        return response
@@ -0,0 +1,127 @@
+import base64
+import binascii
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import Http404
+from django.utils.dateparse import parse_datetime
+
+# Keyset pagination over (published_at, id). A cursor points at the last post
+# of the current page, so a page is an indexed range scan instead of
+# COUNT(*) + OFFSET n.
+NEXT = "n"
+PREVIOUS = "p"
+
+
+def encode_cursor(post, direction):
+    value = f"{direction}|{post.published_at.isoformat()}|{post.pk}"
+    return base64.urlsafe_b64encode(value.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        value = base64.urlsafe_b64decode(cursor + padding).decode()
+        direction, published_at, pk = value.split("|")
+        published_at = parse_datetime(published_at)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise Http404("Invalid cursor")
+    if direction not in (NEXT, PREVIOUS) or published_at is None:
+        raise Http404("Invalid cursor")
+    return direction, published_at, pk
+
+
+class CursorPage:
+    """
+    A page of keyset pagination. It has the parts of django.core.paginator.Page
+    the list templates use, plus next_cursor and previous_cursor.
+    """
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.paginator = None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def paginate_by_cursor(queryset, cursor, page_size):
+    if not cursor:
+        posts = list(queryset.order_by("-published_at", "-id")[: page_size + 1])
+        next_cursor = None
+        if len(posts) > page_size:
+            posts = posts[:page_size]
+            next_cursor = encode_cursor(posts[-1], NEXT)
+        return CursorPage(posts, next_cursor=next_cursor)
+
+    direction, published_at, pk = decode_cursor(cursor)
+
+    if direction == NEXT:
+        posts = list(
+            queryset.filter(
+                Q(published_at__lt=published_at)
+                | Q(published_at=published_at, id__lt=pk)
+            ).order_by("-published_at", "-id")[: page_size + 1]
+        )
+        has_more = len(posts) > page_size
+        posts = posts[:page_size]
+        if not posts:
+            return CursorPage(posts)
+        return CursorPage(
+            posts,
+            next_cursor=encode_cursor(posts[-1], NEXT) if has_more else None,
+            previous_cursor=encode_cursor(posts[0], PREVIOUS),
+        )
+
+    # Walk backwards in ascending order, then flip the page back
+    posts = list(
+        queryset.filter(
+            Q(published_at__gt=published_at) | Q(published_at=published_at, id__gt=pk)
+        ).order_by("published_at", "id")[: page_size + 1]
+    )
+    has_more = len(posts) > page_size
+    posts = posts[:page_size][::-1]
+    if not posts:
+        return CursorPage(posts)
+    return CursorPage(
+        posts,
+        next_cursor=encode_cursor(posts[-1], NEXT),
+        previous_cursor=encode_cursor(posts[0], PREVIOUS) if has_more else None,
+    )
+
+
+class CursorPaginationMixin:
+    """
+    Keyset pagination for ListView over published posts. The page is still
+    exposed as page_obj; set cursor_pagination = False to use page numbers.
+    """
+
+    cursor_pagination = settings.POST_LIST_CURSOR_PAGINATION
+    cursor_query_param = "cursor"
+    paginate_by = settings.POST_LIST_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.cursor_pagination:
+            return super().paginate_queryset(queryset, page_size)
+
+        cursor = self.request.GET.get(self.cursor_query_param)
+        page = paginate_by_cursor(queryset, cursor, page_size)
+        return (None, page, page.object_list, page.has_other_pages())
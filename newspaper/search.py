@@ -0,0 +1,193 @@
+import hashlib
+import logging
+import re
+import unicodedata
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.core.cache import caches
+from django.db import connection
+from django.db.models import Q
+from django.utils.module_loading import import_string
+from django.utils.translation import get_language
+
+from newspaper.models import Post
+
+# Postgres has no Nepali or Hindi dictionary. Their words pass through the
+# english configuration unchanged, so those languages are queried with both
+# the english and the "simple" (lowercase only) configurations.
+SEARCH_CONFIGS = {"en": "english", "ne": "simple", "hi": "simple"}
+
+SEARCH_VERSION_KEY = "search:version"
+
+# One line per search, "<language>\t<normalized query>", read by the
+# warm_search_cache command to find the popular queries
+search_log = logging.getLogger("newspaper.search")
+
+# \w alone splits Devanagari words at their vowel signs
+WORD_RE = re.compile(r"[\w\u0900-\u097f]+")
+
+
+def tokenize(text):
+    return WORD_RE.findall(text.lower())
+
+
+class BaseSearchBackend:
+    """
+    Full-text search over published posts. search() returns post ids ranked by
+    relevance; update() and remove() keep the index in sync as posts change.
+    """
+
+    def search(self, query, limit=None):
+        raise NotImplementedError
+
+    def update(self, post):
+        pass
+
+    def remove(self, post_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """tsvector column with a GIN index, ranked with ts_rank."""
+
+    def vector(self):
+        return SearchVector("title", weight="A", config="english") + SearchVector(
+            "plain_text", weight="B", config="english"
+        )
+
+    def search(self, query, limit=None):
+        config = SEARCH_CONFIGS.get(get_language(), "simple")
+        search_query = SearchQuery(query, config="english", search_type="websearch")
+        if config != "english":
+            search_query |= SearchQuery(query, config=config, search_type="websearch")
+
+        post_ids = (
+            Post.objects.published()
+            .filter(search_vector=search_query)
+            .annotate(rank=SearchRank("search_vector", search_query))
+            .order_by("-rank", "-published_at")
+            .values_list("pk", flat=True)
+        )
+        return list(post_ids[:limit] if limit else post_ids)
+
+    def update(self, post):
+        # update() does not send post_save again
+        Post.objects.filter(pk=post.pk).update(search_vector=self.vector())
+
+    def rebuild(self):
+        Post.objects.update(search_vector=self.vector())
+
+
+class SqliteSearchBackend(BaseSearchBackend):
+    """FTS5 table for local development, stemmed with porter and ranked with bm25."""
+
+    table = "newspaper_post_fts"
+
+    def search(self, query, limit=None):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        # Quoted tokens are matched literally and combined with AND
+        match = " ".join(f'"{token}"' for token in tokens)
+        sql = f"""
+            SELECT fts.rowid FROM {self.table} AS fts
+            JOIN newspaper_post AS post ON post.id = fts.rowid
+            WHERE {self.table} MATCH %s
+              AND post.status = 'active' AND post.published_at IS NOT NULL
+            ORDER BY bm25({self.table}, 10.0, 1.0), post.published_at DESC
+        """
+        params = [match]
+        if limit:
+            sql += " LIMIT %s"
+            params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
+
+    def update(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid = %s", [post.pk])
+            cursor.execute(
+                f"INSERT INTO {self.table} (rowid, title, body) VALUES (%s, %s, %s)",
+                [post.pk, post.title, post.plain_text],
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid = %s", [post_id])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+        for post in Post.objects.only("title", "plain_text").iterator():
+            self.update(post)
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """Unranked substring match for databases without full-text search."""
+
+    def search(self, query, limit=None):
+        post_ids = (
+            Post.objects.published()
+            .filter(Q(title__icontains=query) | Q(plain_text__icontains=query))
+            .order_by("-published_at")
+            .values_list("pk", flat=True)
+        )
+        return list(post_ids[:limit] if limit else post_ids)
+
+
+@lru_cache(maxsize=None)
+def get_search_backend():
+    # SEARCH_BACKEND is optional, the default follows the database vendor
+    path = getattr(settings, "SEARCH_BACKEND", None)
+    if path:
+        return import_string(path)()
+    if connection.vendor == "postgresql":
+        return PostgresSearchBackend()
+    if connection.vendor == "sqlite":
+        return SqliteSearchBackend()
+    return SimpleSearchBackend()
+
+
+def normalize_query(query):
+    query = unicodedata.normalize("NFKC", query)
+    return " ".join(query.lower().split())
+
+
+def invalidate_search():
+    # Any published post may match any cached query, so a change drops them all
+    cache = caches["search"]
+    try:
+        cache.incr(SEARCH_VERSION_KEY)
+    except ValueError:
+        cache.set(SEARCH_VERSION_KEY, 1, None)
+
+
+def search_post_ids(query, log=True):
+    """
+    Ranked ids of the published posts matching the query. Results are cached
+    per normalized query and language, so a repeated search only loads its page.
+    """
+    query = normalize_query(query)
+    if not query:
+        return []
+    language = get_language()
+    if log:
+        search_log.info("%s\t%s", language, query)
+
+    cache = caches["search"]
+    version = cache.get_or_set(SEARCH_VERSION_KEY, 1, None)
+    digest = hashlib.md5(query.encode()).hexdigest()
+    key = f"search:{version}:{language}:{digest}"
+    post_ids = cache.get(key)
+    if post_ids is None:
+        post_ids = get_search_backend().search(
+            query, limit=settings.SEARCH_RESULTS_LIMIT
+        )
+        cache.set(key, post_ids, settings.SEARCH_CACHE_TIMEOUT)
+    return post_ids
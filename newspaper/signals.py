@@ -0,0 +1,176 @@
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from newspaper import counters
+from newspaper.home import invalidate_home
+from newspaper.images import (
+    has_renditions,
+    schedule_featured_image,
+    schedule_renditions,
+)
+from newspaper.models import Category, Comment, Post, Tag, UserProfile
+from newspaper.navigation import invalidate_navigation
+from newspaper.page_cache import purge
+from newspaper.search import get_search_backend, invalidate_search
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def navigation_changed(sender, **kwargs):
+    invalidate_navigation()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Category)
+def home_changed(sender, **kwargs):
+    invalidate_home()
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    get_search_backend().update(instance)
+    invalidate_search()
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    get_search_backend().remove(instance.pk)
+    invalidate_search()
+
+
+# Changing one of these moves a post in or out of the lists, the neighbours of
+# other posts and the navigation
+LISTING_FIELDS = ("status", "published_at", "category_id")
+
+
+@receiver(pre_save, sender=Post)
+def remember_listing(sender, instance, **kwargs):
+    instance._listed_as = None
+    if instance.pk:
+        # Also what the counters depend on, see count_post()
+        instance._listed_as = (
+            Post.objects.filter(pk=instance.pk).values(*counters.LISTING_FIELDS).first()
+        )
+
+
+@receiver(post_save, sender=Post)
+def purge_post_pages(sender, instance, **kwargs):
+    keys = {f"post:{instance.pk}"}
+    listed_as = getattr(instance, "_listed_as", None)
+    if not listed_as or any(
+        listed_as[field] != getattr(instance, field) for field in LISTING_FIELDS
+    ):
+        keys.update({"nav", "posts", f"category:{instance.category_id}"})
+        if listed_as:
+            keys.add(f"category:{listed_as['category_id']}")
+    purge(*keys)
+
+
+@receiver(post_delete, sender=Post)
+def purge_deleted_post_pages(sender, instance, **kwargs):
+    purge(f"post:{instance.pk}", "nav", "posts", f"category:{instance.category_id}")
+
+
+@receiver(m2m_changed, sender=Post.tag.through)
+def purge_post_tag_pages(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if reverse:
+        # instance is a Tag, pk_set holds posts (None when cleared)
+        purge(f"tag:{instance.pk}", *(f"post:{pk}" for pk in pk_set or ()))
+    else:
+        purge(f"post:{instance.pk}", *(f"tag:{pk}" for pk in pk_set or ()))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def purge_comment_pages(sender, instance, **kwargs):
+    purge(f"post:{instance.post_id}")
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def purge_category_pages(sender, instance, **kwargs):
+    purge(f"category:{instance.pk}", "nav")
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def purge_tag_pages(sender, instance, **kwargs):
+    purge(f"tag:{instance.pk}", "nav")
+
+
+@receiver(post_save, sender=Post)
+def count_post(sender, instance, update_fields=None, **kwargs):
+    stored = getattr(instance, "_listed_as", None)
+    counters.move_post(
+        instance.pk, stored, counters.listing(instance, stored, update_fields)
+    )
+
+
+@receiver(pre_delete, sender=Post)
+def uncount_post(sender, instance, **kwargs):
+    # Before the delete, while the post's tags are still there
+    counters.move_post(instance.pk, counters.listing(instance), None)
+
+
+@receiver(m2m_changed, sender=Post.tag.through)
+def count_post_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "post_add":
+        if reverse:
+            counters.move_tags([(pk, instance.pk) for pk in pk_set], 1)
+        else:
+            counters.move_tags([(instance.pk, pk) for pk in pk_set], 1)
+    elif action in ("pre_remove", "pre_clear"):
+        # Only the links that exist, remove() accepts any pk
+        links = sender.objects.filter(**{"tag" if reverse else "post": instance})
+        if pk_set is not None:
+            links = links.filter(**{"post__in" if reverse else "tag__in": pk_set})
+        instance._removed_tags = list(links.values_list("post_id", "tag_id"))
+    elif action in ("post_remove", "post_clear"):
+        counters.move_tags(instance._removed_tags, -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.add(Post, "comment_count", {instance.post_id: 1})
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    counters.add(Post, "comment_count", {instance.post_id: -1})
+
+
+def renditions_needed(image, update_fields):
+    if update_fields and image.field.name not in update_fields:
+        return False
+    return bool(image) and not has_renditions(image.name)
+
+
+@receiver(post_save, sender=Post)
+def process_post_image(sender, instance, update_fields=None, **kwargs):
+    image = instance.featured_image
+    if update_fields and "featured_image" not in update_fields:
+        return
+    if image and not instance.featured_image_placeholder:
+        transaction.on_commit(lambda: schedule_featured_image(instance.pk, image.name))
+
+
+@receiver(post_save, sender=UserProfile)
+def profile_image_renditions(sender, instance, update_fields=None, **kwargs):
+    image = instance.image
+    if renditions_needed(image, update_fields):
+        transaction.on_commit(lambda: schedule_renditions(image.name))
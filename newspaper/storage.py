@@ -0,0 +1,67 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+from newspaper.images import has_renditions, optimize_image, schedule_renditions
+
+BLOB_DIR = "blobs"
+
+# Blob URLs never change content, so browsers and CDNs may keep them forever
+IMMUTABLE = {"public": True, "max_age": 60 * 60 * 24 * 365, "immutable": True}
+
+
+def content_digest(content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def blob_name(digest, name):
+    extension = os.path.splitext(name)[1].lower()
+    return f"{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores every upload once, under the SHA-256 of its content, e.g.
+    blobs/3a/7b/3a7b...e1.jpg; only the extension of the given name is kept.
+    Uploading the same photo again returns the name of the file already there.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = blob_name(content_digest(content), name)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
+
+
+class OptimizedImageStorage(ContentAddressedStorage):
+    """
+    Storage for images pasted into the editor (SUMMERNOTE_CONFIG
+    attachment_storage_class). Phone photos are re-encoded without their
+    metadata and capped at INLINE_IMAGE_MAX_SIZE before they are written, and
+    their responsive renditions are generated in the background.
+    """
+
+    def save(self, name, content, max_length=None):
+        optimized = optimize_image(content, settings.INLINE_IMAGE_MAX_SIZE)
+        if optimized is not None:
+            extension, content = optimized
+            name = f"{name.rsplit('.', 1)[0]}.{extension}"
+        name = super().save(name, content, max_length)
+        if optimized is not None and not has_renditions(name):
+            schedule_renditions(name)
+        return name
+
+
+blob_storage = ContentAddressedStorage()
@@ -0,0 +1,43 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from newspaper.images import picture_sources, srcset
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(image, sizes="100vw", **attrs):
+    """
+    <picture> with AVIF/WebP sources and a JPEG srcset for an uploaded image,
+    e.g. {% responsive_image post.featured_image sizes="150px" alt=post.title %}.
+    Extra keyword arguments become attributes of the <img>.
+
+    When the model has <field>_width, <field>_height and <field>_placeholder,
+    the box keeps the image's aspect ratio and shows the placeholder until the
+    image is loaded.
+    """
+    if not image:
+        return ""
+    attrs.setdefault("loading", "lazy")
+    attrs.setdefault("decoding", "async")
+
+    field = image.field.name
+    width = getattr(image.instance, f"{field}_width", None)
+    height = getattr(image.instance, f"{field}_height", None)
+    placeholder = getattr(image.instance, f"{field}_placeholder", "")
+    style = [attrs.pop("style", "")]
+    if width and height:
+        style.append(f"aspect-ratio: {width} / {height}")
+    if placeholder:
+        style.append(f"background: url({placeholder}) center / cover no-repeat")
+    if any(style):
+        attrs["style"] = "; ".join(filter(None, style))
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}"{}></picture>',
+        picture_sources(image.name, sizes),
+        image.url,
+        srcset(image.name, "jpg"),
+        sizes,
+        format_html_join("", ' {}="{}"', attrs.items()),
+    )
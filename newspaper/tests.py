@@ -1,3 +1,406 @@
-from django.test import TestCase
+import threading
+import time
+import warnings
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from newspaper import cache as tiered
+from newspaper import counters
+from newspaper.cache import TieredCache, hot_cache
+from newspaper.models import Category, Comment, DeferredBodyWarning, Post, Tag
+from newspaper.pagination import CursorPaginationMixin
+from newspaper import view_counter
+from newspaper.view_counter import flush_views, pending_views, record_view
+
+# Any page of the tests that loads a deferred post body fails
+warnings.simplefilter("error", DeferredBodyWarning)
+
+
+def create_posts(count, category, tags=(), author=None, **fields):
+    author = author or User.objects.get_or_create(username="reporter")[0]
+    now = timezone.now()
+    posts = []
+    for number in range(count):
+        post = Post.objects.create(
+            title=f"Post {number}",
+            content=f"<p>Body of post {number}</p>",
+            author=author,
+            category=category,
+            published_at=now - timedelta(hours=number),
+            **fields,
+        )
+        post.tag.set(tags)
+        posts.append(post)
+    return posts
+
+
+def explain(queryset):
+    with connection.cursor() as cursor:
+        # Statistics, so that the planner sees a table worth an index
+        cursor.execute("ANALYZE")
+        if connection.vendor == "postgresql":
+            # A handful of rows is cheaper to scan and sort; ask for the plan
+            # of a large table instead
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("SET LOCAL enable_sort = off")
+    return queryset.explain()
+
+
+class PublishedIndexTests(TestCase):
+    """The feeds of the public pages read the partial indexes in order."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="world")
+        cls.tag = Tag.objects.create(name="elections")
+        create_posts(30, cls.category, [cls.tag])
+        create_posts(5, Category.objects.create(name="sports"))
+        create_posts(5, cls.category, status="in_active")
+
+    def assertUsesIndex(self, queryset, index):
+        plan = explain(queryset)
+        self.assertIn(index, plan)
+        # The ORDER BY is read off the index rather than sorted afterwards
+        self.assertNotIn("TEMP B-TREE", plan)
+        if connection.vendor == "postgresql":
+            self.assertNotIn("Sort", plan)
+
+    def test_post_list(self):
+        posts = Post.objects.published().order_by("-published_at", "-id")[:11]
+        self.assertUsesIndex(posts, "post_published_feed_idx")
+
+    def test_category_list(self):
+        posts = Post.objects.published().filter(category=self.category)
+        posts = posts.order_by("-published_at", "-id")[:11]
+        self.assertUsesIndex(posts, "post_category_feed_idx")
+
+    def test_tag_list(self):
+        # Walks the feed in order and probes the tags of each post
+        posts = Post.objects.published().filter(tag=self.tag)
+        posts = posts.order_by("-published_at", "-id")[:11]
+        self.assertUsesIndex(posts, "post_published_feed_idx")
+
+    def test_trending(self):
+        posts = Post.objects.published().order_by("-views_count")[:3]
+        self.assertUsesIndex(posts, "post_trending_idx")
+
+
+def clear_caches():
+    for cache in caches.all():
+        cache.clear()
+    hot_cache.clear_local()
+
+
+@mock.patch.object(CursorPaginationMixin, "paginate_by", 10)
+class QueryCountTests(TestCase):
+    """A page costs the same number of queries whatever the number of posts."""
+
+    def setUp(self):
+        self.category = Category.objects.create(name="world")
+        self.tag = Tag.objects.create(name="elections")
+        self.urls = [
+            reverse("home"),
+            reverse("post-list"),
+            reverse("post-by-category", args=[self.category.pk]),
+            reverse("post-by-tag", args=[self.tag.pk]),
+        ]
+        self.add_posts(1)
+
+    def add_posts(self, count):
+        for number in range(count):
+            author = User.objects.create(username=f"author{Post.objects.count()}")
+            post = create_posts(1, self.category, [self.tag], author=author)[0]
+            Comment.objects.create(post=post, name="Reader", email="r@example.com")
+
+    def count_queries(self, url):
+        clear_caches()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_pages(self):
+        counts = {url: self.count_queries(url) for url in self.urls}
+        self.add_posts(9)
+        for url, count in counts.items():
+            with self.subTest(url=url):
+                clear_caches()
+                with self.assertNumQueries(count):
+                    self.client.get(url)
+
+
+class DeferredBodyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.post = create_posts(1, Category.objects.create(name="world"))[0]
+
+    def test_listing_body_fails(self):
+        post = Post.objects.for_listing().get(pk=self.post.pk)
+        self.assertEqual(post.excerpt, "Body of post 0")
+        with self.assertRaises(DeferredBodyWarning):
+            post.content
+
+    @override_settings(DEBUG=True)
+    def test_listing_body_fails_while_debugging(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeferredBodyWarning)
+            post = Post.objects.for_listing().get(pk=self.post.pk)
+            with self.assertRaises(DeferredBodyWarning):
+                post.content_html
+
+    def test_other_deferred_fields_load(self):
+        post = Post.objects.only("id").get(pk=self.post.pk)
+        self.assertEqual(post.title, "Post 0")
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "tiered-cache-tests",
+        }
+    }
+)
+class TieredCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = TieredCache(local_size=2)
+        self.cache.shared.clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return f"value {self.calls}"
+
+    def expire(self, key):
+        # Past its fresh period, in both tiers
+        entry = self.cache.shared.get(key)
+        entry["fresh_until"] = time.time() - 1
+        self.cache.shared.set(key, entry)
+        self.cache._set_local(key, entry)
+
+    def hold_lock(self, key):
+        self.cache.shared.add(tiered.LOCK_KEY.format(key), 1)
+
+    def test_hits(self):
+        self.assertEqual(self.cache.get_or_compute("k", self.compute, 60), "value 1")
+        self.assertEqual(self.cache.get_or_compute("k", self.compute, 60), "value 1")
+        self.cache.clear_local()
+        self.assertEqual(self.cache.get_or_compute("k", self.compute, 60), "value 1")
+        self.assertEqual(
+            self.cache.metrics(), {"recompute": 1, "local_hit": 1, "shared_hit": 1}
+        )
+
+    def test_stale_value_recomputed_by_lock_holder(self):
+        self.cache.get_or_compute("k", self.compute, 60)
+        self.expire("k")
+        self.assertEqual(self.cache.get_or_compute("k", self.compute, 60), "value 2")
+        self.assertIsNone(self.cache.shared.get(tiered.LOCK_KEY.format("k")))
+
+    def test_stale_value_served_while_locked(self):
+        self.cache.get_or_compute("k", self.compute, 60)
+        self.expire("k")
+        self.hold_lock("k")
+        self.assertEqual(self.cache.get_or_compute("k", self.compute, 60), "value 1")
+        self.assertEqual(self.calls, 1)
+
+    def test_local_stale_value_served_after_shared_eviction(self):
+        self.cache.get_or_compute("k", self.compute, 60)
+        self.expire("k")
+        self.cache.shared.delete("k")
+        self.hold_lock("k")
+        self.assertEqual(self.cache.get_or_compute("k", self.compute, 60), "value 1")
+        self.assertEqual(self.cache.metrics()["stale_hit"], 1)
+
+    @mock.patch.object(tiered, "WAIT_TIMEOUT", 0.2)
+    def test_miss_waits_then_recomputes(self):
+        self.hold_lock("k")
+        self.assertEqual(self.cache.get_or_compute("k", self.compute, 60), "value 1")
+        self.assertEqual(self.cache.metrics(), {"miss": 1, "recompute": 1})
+
+    def test_single_flight(self):
+        def slow_compute():
+            time.sleep(0.2)
+            return self.compute()
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    self.cache.get_or_compute("k", slow_compute, 60)
+                )
+            )
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ["value 1"] * 10)
+        self.assertEqual(self.calls, 1)
+
+    def test_jitter(self):
+        fresh_for = set()
+        for number in range(20):
+            start = time.time()
+            self.cache.get_or_compute(f"k{number}", self.compute, 100)
+            fresh_for.add(
+                round(self.cache.shared.get(f"k{number}")["fresh_until"] - start)
+            )
+        self.assertGreater(len(fresh_for), 1)
+        self.assertTrue(all(90 <= seconds <= 110 for seconds in fresh_for))
+
+    def test_local_tier_is_bounded(self):
+        for key in ("a", "b", "c"):
+            self.cache.get_or_compute(key, self.compute, 60)
+        self.assertEqual(list(self.cache._local), ["b", "c"])
+
+
+class PostSaveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.post = create_posts(1, Category.objects.create(name="world"))[0]
+
+    def test_content_processed_when_saved(self):
+        self.post.content = "<p>New body</p><script>alert(1)</script>"
+        self.post.save(update_fields=["content"])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.excerpt, "New body")
+        self.assertNotIn("<script>", self.post.content_html)
+
+    def test_content_not_processed_for_other_fields(self):
+        with mock.patch("newspaper.models.process_content") as process_content:
+            self.post.status = "in_active"
+            self.post.save(update_fields=["status"])
+        process_content.assert_not_called()
+
+
+class CounterTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.world = Category.objects.create(name="world")
+        self.sports = Category.objects.create(name="sports")
+        self.elections = Tag.objects.create(name="elections")
+        self.football = Tag.objects.create(name="football")
+        self.post = create_posts(1, self.world, [self.elections], views_count=10)[0]
+
+    def assertCounters(self, instance, posts, views):
+        instance.refresh_from_db()
+        self.assertEqual(
+            (instance.published_post_count, instance.total_views), (posts, views)
+        )
+
+    def test_created(self):
+        self.assertCounters(self.world, 1, 10)
+        self.assertCounters(self.elections, 1, 10)
+        self.assertCounters(self.sports, 0, 0)
+
+    def test_flushed_views(self):
+        for _ in range(3):
+            record_view(self.post.pk)
+        self.assertEqual(flush_views([self.post.pk]), 3)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views_count, 13)
+        self.assertCounters(self.world, 1, 13)
+        self.assertCounters(self.elections, 1, 13)
+
+    def test_add_views_ignores_unknown_posts(self):
+        counters.add_views({self.post.pk: 2, str(self.post.pk): 5, 0: 1})
+        self.assertCounters(self.world, 1, 12)
+        self.assertCounters(self.elections, 1, 12)
+
+    def test_unpublish_and_publish(self):
+        self.post.status = "in_active"
+        self.post.save(update_fields=["status"])
+        self.assertCounters(self.world, 0, 0)
+        self.assertCounters(self.elections, 0, 0)
+        self.post.status = "active"
+        self.post.save()
+        self.assertCounters(self.world, 1, 10)
+        self.assertCounters(self.elections, 1, 10)
+
+    def test_move(self):
+        self.post.category = self.sports
+        self.post.save()
+        self.assertCounters(self.world, 0, 0)
+        self.assertCounters(self.sports, 1, 10)
+
+    def test_tags(self):
+        self.post.tag.add(self.football)
+        self.assertCounters(self.football, 1, 10)
+        self.football.post_set.remove(self.post)
+        self.assertCounters(self.football, 0, 0)
+        self.post.tag.clear()
+        self.assertCounters(self.elections, 0, 0)
+
+    def test_delete(self):
+        self.post.delete()
+        self.assertCounters(self.world, 0, 0)
+        self.assertCounters(self.elections, 0, 0)
+
+    def test_comments(self):
+        comment = Comment.objects.create(post=self.post, name="Reader")
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        comment.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+
+    def test_reconcile(self):
+        self.post.tag.add(self.football)
+        self.post.category = self.sports
+        self.post.save()
+        Comment.objects.create(post=self.post, name="Reader")
+        record_view(self.post.pk)
+        flush_views([self.post.pk])
+        self.assertEqual(counters.reconcile(), {"category": 0, "tag": 0, "post": 0})
+
+        Category.objects.filter(pk=self.sports.pk).update(total_views=999)
+        Post.objects.filter(pk=self.post.pk).update(comment_count=0)
+        call_command("reconcile_counters", stdout=StringIO())
+        self.assertCounters(self.sports, 1, 11)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertEqual(counters.reconcile(), {"category": 0, "tag": 0, "post": 0})
+
+
+class ViewCounterTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.post = create_posts(1, Category.objects.create(name="world"))[0]
+        for _ in range(5):
+            record_view(self.post.pk)
+
+    def test_concurrent_flushes_write_views_once(self):
+        # Both flushes read the 5 pending views before either claims them
+        key = view_counter.PENDING_KEY.format(self.post.pk)
+        with mock.patch.object(view_counter.cache, "get_many", return_value={key: 5}):
+            written = flush_views([self.post.pk]) + flush_views([self.post.pk])
+        self.assertEqual(written, 5)
+        self.assertEqual(view_counter.cache.get(key), 0)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views_count, 5)
+
+    def test_failed_write_keeps_the_views(self):
+        with mock.patch.object(view_counter, "add_views", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                flush_views([self.post.pk])
+        self.assertEqual(pending_views(self.post.pk), 5)
+        self.assertEqual(flush_views([self.post.pk]), 5)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views_count, 5)
+
+
+class ImageRenditionViewTests(TestCase):
+    def test_unknown_format(self):
+        response = self.client.get("/media/blobs/aa/bb/image.160w.gif")
+        self.assertEqual(response.status_code, 404)
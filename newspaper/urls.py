@@ -1,4 +1,5 @@
-from django.urls import path
+from django.conf import settings
+from django.urls import path, re_path
 
 from newspaper import views
 
@@ -53,4 +54,20 @@ urlpatterns = [
         views.NewsletterView.as_view(),
         name="newsletter",
     ),
+    re_path(
+        rf"^{settings.MEDIA_URL.lstrip('/')}(?P<name>.+\.\d+w\.[a-z]+)$",
+        views.ImageRenditionView.as_view(),
+        name="image-rendition",
+    ),
+    re_path(
+        rf"^{settings.MEDIA_URL.lstrip('/')}"
+        r"(?P<name>blobs/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.[a-z0-9]+)$",
+        views.BlobView.as_view(),
+        name="blob",
+    ),
+    re_path(
+        rf"^{settings.MEDIA_URL.lstrip('/')}(?P<name>.+)$",
+        views.MediaView.as_view(),
+        name="media",
+    ),
 ]
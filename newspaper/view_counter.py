@@ -0,0 +1,149 @@
+import atexit
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, When
+
+from newspaper.counters import add_views
+from newspaper.models import Post
+from newspaper.navigation import invalidate_navigation
+
+# Hits are absorbed by an atomic counter per post in the default cache and
+# written to Post.views_count in batches, one UPDATE per batch. Only a shared
+# cache (REDIS_URL) lets flush_view_counts see the counters of the workers.
+PENDING_KEY = "views:pending:{}"
+
+_lock = threading.Lock()
+_dirty_ids = set()  # posts this process has counted since its last flush
+_last_flush = time.monotonic()
+
+
+def _pending_key(post_id):
+    return PENDING_KEY.format(post_id)
+
+
+def record_view(post_id):
+    """Count a view of the post and return the number of unflushed views."""
+    # The flush matches the ids against the pks of the database rows
+    post_id = int(post_id)
+    pending = _add_pending(_pending_key(post_id), 1)
+    with _lock:
+        _dirty_ids.add(post_id)
+    maybe_flush()
+    return pending
+
+
+@atexit.register
+def flush_on_exit():
+    # Workers restarted or recycled by gunicorn (max_requests) write what they
+    # counted, a process-local buffer would be lost with them
+    with _lock:
+        post_ids = list(_dirty_ids)
+        _dirty_ids.clear()
+    if post_ids:
+        flush_views(post_ids)
+
+
+def pending_views(post_id):
+    # Briefly negative while two flushes settle a claim, see _claim()
+    return max(0, cache.get(_pending_key(post_id), 0))
+
+
+def maybe_flush():
+    global _last_flush
+
+    with _lock:
+        due = (
+            len(_dirty_ids) >= settings.VIEW_COUNT_FLUSH_BATCH_SIZE
+            or time.monotonic() - _last_flush >= settings.VIEW_COUNT_FLUSH_INTERVAL
+        )
+        if not due:
+            return 0
+        post_ids = list(_dirty_ids)
+        _dirty_ids.clear()
+        _last_flush = time.monotonic()
+
+    return flush_views(post_ids)
+
+
+def flush_views(post_ids=None):
+    """
+    Write buffered views to the database and return the number of views written.
+    Without post_ids every post is checked, which is what the management command does.
+    """
+    if post_ids is None:
+        post_ids = Post.objects.values_list("pk", flat=True).iterator()
+
+    flushed = 0
+    batch = []
+    for post_id in post_ids:
+        batch.append(post_id)
+        if len(batch) >= settings.VIEW_COUNT_FLUSH_BATCH_SIZE:
+            flushed += _flush_batch(batch)
+            batch = []
+    if batch:
+        flushed += _flush_batch(batch)
+
+    if flushed:
+        # Trending posts and top categories are ranked by views
+        invalidate_navigation()
+    return flushed
+
+
+def _add_pending(key, views):
+    cache.add(key, 0, None)
+    try:
+        return cache.incr(key, views)
+    except ValueError:
+        # The counter was evicted between add() and incr()
+        cache.set(key, views, None)
+        return views
+
+
+def _claim(key, pending):
+    """
+    Take the `pending` views read from a counter off it before writing them,
+    so that workers and the cron job flushing the same post at once never
+    write the same views twice. Returns the number of views claimed.
+    """
+    try:
+        left = cache.decr(key, pending)
+    except ValueError:
+        # Evicted, the views are lost
+        return 0
+    if left >= 0:
+        return pending
+    # Another flush claimed some of them first, give back the difference
+    claimed = max(0, pending + left)
+    _add_pending(key, pending - claimed)
+    return claimed
+
+
+def _flush_batch(post_ids):
+    keys = {_pending_key(post_id): int(post_id) for post_id in post_ids}
+    deltas = {}
+    for key, pending in cache.get_many(keys).items():
+        # Hits that arrive after the claim stay buffered for the next flush
+        claimed = _claim(key, pending) if pending > 0 else 0
+        if claimed:
+            deltas[keys[key]] = claimed
+    if not deltas:
+        return 0
+
+    try:
+        with transaction.atomic():
+            Post.objects.filter(pk__in=deltas).update(
+                views_count=F("views_count")
+                + Case(*[When(pk=pk, then=delta) for pk, delta in deltas.items()])
+            )
+            # The total views of their categories and tags
+            add_views(deltas)
+    except Exception:
+        # Back into the buffer for the next flush
+        for post_id, delta in deltas.items():
+            _add_pending(_pending_key(post_id), delta)
+        raise
+    return sum(deltas.values())
@@ -1,45 +1,37 @@
-from datetime import timedelta
-
 from django.contrib import messages
 from django.shortcuts import redirect, render
-from django.utils import timezone
+from django.utils.translation import get_language
 from django.views.generic import DetailView, ListView, TemplateView, View
 
+from newspaper.conditional import not_modified, post_validators, set_validators
 from newspaper.forms import ContactForm, NewsletterForm
+from newspaper.home import get_home_context
 from newspaper.models import Post
+from newspaper.navigation import get_navigation_version
+from newspaper.page_cache import (
+    PageCacheListMixin,
+    count_view_on_hit,
+    is_warming,
+    post_keys,
+    tag_page,
+)
+from newspaper.pagination import CursorPaginationMixin
+from newspaper.view_counter import pending_views, record_view
 
 # Post.objects.all() => QuerySet => ORM => Object Relationship Mapping
 # select * from posts;
 
 
-class HomeView(ListView):
-    model = Post
+class HomeView(TemplateView):
     template_name = "aznews/home.html"
-    context_object_name = "posts"
-    queryset = Post.objects.filter(
-        published_at__isnull=False, status="active"
-    ).order_by("-published_at")[:5]
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["featured_post"] = (
-            Post.objects.filter(published_at__isnull=False, status="active")
-            .order_by("-published_at", "-views_count")
-            .first()
-        )
-        context["featured_posts"] = Post.objects.filter(
-            published_at__isnull=False, status="active"
-        ).order_by("-published_at", "-views_count")[1:4]
-
-        one_week_ago = timezone.now() - timedelta(days=7)
-        context["weekly_top_posts"] = Post.objects.filter(
-            published_at__isnull=False, status="active", published_at__gte=one_week_ago
-        ).order_by("-published_at", "-views_count")[:7]
-
-        context["recent_posts"] = Post.objects.filter(
-            published_at__isnull=False, status="active"
-        ).order_by("-published_at")[:7]
+        # posts, featured_post, featured_posts, weekly_top_posts and recent_posts
+        context.update(get_home_context())
 
+        posts = {*context["recent_posts"], *context["weekly_top_posts"]}
+        tag_page(self.request, "posts", *post_keys(posts))
         return context
 
 
@@ -73,16 +65,18 @@ class ContactView(View):
             )
 
 
-class PostListView(ListView):
+class PostListView(PageCacheListMixin, CursorPaginationMixin, ListView):
     model = Post
     template_name = "aznews/list/list.html"
     context_object_name = "posts"
-    paginate_by = 1
 
     def get_queryset(self):
-        return Post.objects.filter(
-            published_at__isnull=False, status="active"
-        ).order_by("-published_at")
+        return (
+            Post.objects.filter(published_at__isnull=False, status="active")
+            .for_display()
+            .for_listing()
+            .order_by("-published_at")
+        )
 
 
 class PostDetailView(DetailView):
@@ -93,64 +87,96 @@ class PostDetailView(DetailView):
     def get_queryset(self):
         query = super().get_queryset()
         query = query.filter(published_at__isnull=False, status="active")
-        return query
+        # The previous and next posts in publication order come with the post
+        return query.for_display().with_neighbours()
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        obj = self.get_object()
-        obj.views_count += 1
-        obj.save()
-
-        # 7 => 1, 2, 3, 4, 5, 6 => 6, 5, 4, 3, 2, 1
-        context["previous_post"] = (
-            Post.objects.filter(
-                published_at__isnull=False, status="active", id__lt=obj.id
-            )
-            .order_by("-id")
-            .first()
+    def get(self, request, *args, **kwargs):
+        validators = post_validators(
+            Post.objects.published(),
+            kwargs["pk"],
+            # The rest of the page: navigation, language and the header links
+            get_navigation_version(),
+            get_language(),
+            request.user.is_authenticated,
         )
+        if validators is None:
+            return super().get(request, *args, **kwargs)
 
-        # 8, 9, 10 ....
-        context["next_post"] = (
-            Post.objects.filter(
-                published_at__isnull=False, status="active", id__gt=obj.id
-            )
-            .order_by("id")
-            .first()
-        )
+        response = not_modified(request, *validators)
+        if response is not None:
+            # The reader still saw the post, from their own cache
+            record_view(kwargs["pk"])
+            return response
+        response = super().get(request, *args, **kwargs)
+        return set_validators(response, *validators)
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        obj = self.object
+        # Buffered, the rendered count includes views not yet flushed
+        if is_warming(self.request):
+            obj.views_count += pending_views(obj.pk)
+        else:
+            obj.views_count += record_view(obj.pk)
+
+        context["previous_post"] = obj.previous_post
+        context["next_post"] = obj.next_post
+
+        tag_page(
+            self.request,
+            f"post:{obj.pk}",
+            f"category:{obj.category_id}",
+            *(f"tag:{tag.pk}" for tag in obj.tag.all()),
+            # Their titles and images are linked from this page
+            *post_keys(post for post in (obj.previous_post, obj.next_post) if post),
+        )
+        count_view_on_hit(self.request, obj.pk)
         return context
 
 
-class PostByCategoryView(ListView):
+class PostByCategoryView(PageCacheListMixin, CursorPaginationMixin, ListView):
     model = Post
     template_name = "aznews/list/list.html"
     context_object_name = "posts"
-    paginate_by = 1
+
+    def get_page_keys(self):
+        return [f"category:{self.kwargs['category_id']}"]
 
     def get_queryset(self):
         query = super().get_queryset()
-        query = query.filter(
-            published_at__isnull=False,
-            status="active",
-            category__id=self.kwargs["category_id"],
-        ).order_by("-published_at")
+        query = (
+            query.filter(
+                published_at__isnull=False,
+                status="active",
+                category__id=self.kwargs["category_id"],
+            )
+            .for_display()
+            .for_listing()
+            .order_by("-published_at")
+        )
         return query
 
 
-class PostByTagView(ListView):
+class PostByTagView(PageCacheListMixin, CursorPaginationMixin, ListView):
     model = Post
     template_name = "aznews/list/list.html"
     context_object_name = "posts"
-    paginate_by = 1
+
+    def get_page_keys(self):
+        return [f"tag:{self.kwargs['tag_id']}"]
 
     def get_queryset(self):
         query = super().get_queryset()
-        query = query.filter(
-            published_at__isnull=False,
-            status="active",
-            tag__id=self.kwargs["tag_id"],
-        ).order_by("-published_at")
+        query = (
+            query.filter(
+                published_at__isnull=False,
+                status="active",
+                tag__id=self.kwargs["tag_id"],
+            )
+            .for_display()
+            .for_listing()
+            .order_by("-published_at")
+        )
         return query
 
 
@@ -174,7 +200,8 @@ class CommentView(View):
 
 
 from django.core.paginator import PageNotAnInteger, Paginator
-from django.db.models import Q
+
+from newspaper.search import search_post_ids
 
 
 class PostSearchView(View):
@@ -182,22 +209,28 @@ class PostSearchView(View):
 
     def get(self, request, *args, **kwargs):
         query = request.GET["query"]  # query=plus search => title=plus or content=plus
-        post_list = Post.objects.filter(
-            (Q(title__icontains=query) | Q(content__icontains=query))
-            & Q(status="active")
-            & Q(published_at__isnull=False)
-        ).order_by("-published_at")
+        post_ids = search_post_ids(query)
 
         # pagination start
         page = request.GET.get("page", 1)  # 2
         paginate_by = 3
-        paginator = Paginator(post_list, paginate_by)
+        paginator = Paginator(post_ids, paginate_by)
         try:
             posts = paginator.page(page)
         except PageNotAnInteger:
             posts = paginator.page(1)
         # pagination end
 
+        # Load only the posts of this page, in the ranked order
+        posts_by_id = (
+            Post.objects.for_display().for_listing().in_bulk(posts.object_list)
+        )
+        posts.object_list = [
+            posts_by_id[post_id]
+            for post_id in posts.object_list
+            if post_id in posts_by_id
+        ]
+
         return render(
             request,
             self.template_name,
@@ -238,3 +271,100 @@ class NewsletterView(View):
                 },
                 status=400,
             )
+
+
+from django.core.files.storage import default_storage
+from django.http import Http404
+from django.utils.cache import patch_cache_control
+
+from newspaper.images import (
+    FORMATS,
+    RENDITION_RE,
+    find_original,
+    generate_renditions,
+    is_rendition,
+)
+from newspaper.media import is_unpublished_image, serve_file
+from newspaper.storage import IMMUTABLE, blob_storage
+
+
+class MediaView(View):
+    """
+    Serve an upload from MEDIA_URL. Featured images of posts that are not
+    published yet are only shown to signed-in users. The transfer is handed
+    to the web server when MEDIA_SENDFILE_HEADER is set.
+    """
+
+    storage = default_storage
+    cache_control = {"public": True, "max_age": 60 * 60 * 24}
+
+    def get(self, request, name):
+        return self.serve(request, name, self.check_access(request, name))
+
+    def check_access(self, request, name):
+        """Whether the file is private, 404 for anonymous users on drafts."""
+        private = is_unpublished_image(name)
+        if private and not request.user.is_authenticated:
+            raise Http404("No such file")
+        return private
+
+    def serve(self, request, name, private):
+        response = serve_file(
+            request,
+            self.storage,
+            name,
+            etag=self.get_etag(name),
+            content_type=self.get_content_type(name),
+        )
+        patch_cache_control(
+            response, **({"private": True} if private else self.cache_control)
+        )
+        return response
+
+    def get_etag(self, name):
+        return None
+
+    def get_content_type(self, name):
+        return None
+
+
+class ImageRenditionView(MediaView):
+    """
+    Serve an image rendition, generating it first when it does not exist yet
+    (the upload is still being processed, or was never backfilled).
+    """
+
+    # A new upload always gets a new name
+    cache_control = IMMUTABLE
+
+    def get(self, request, name):
+        if not is_rendition(name):
+            # e.g. image.160w.gif, not a format renditions are made in
+            raise Http404("No such image")
+        # Before generating, anonymous visitors must not render drafts' images
+        private = self.check_access(request, name)
+        if not self.storage.exists(name):
+            original = find_original(name)
+            if original is None:
+                raise Http404("No such image")
+            match = RENDITION_RE.match(name)
+            generate_renditions(
+                original, widths=[int(match["width"])], formats=[match["ext"]]
+            )
+        return self.serve(request, name, private)
+
+    def get_content_type(self, name):
+        return FORMATS[RENDITION_RE.match(name)["ext"]][1]
+
+
+class BlobView(MediaView):
+    """
+    Serve an upload from the content-addressed storage. The digest in the name
+    is the ETag and the file can be cached forever.
+    """
+
+    storage = blob_storage
+    cache_control = IMMUTABLE
+
+    def get_etag(self, name):
+        return '"{}"'.format(name.rsplit("/", 1)[-1].split(".", 1)[0])
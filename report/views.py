@@ -87,7 +87,7 @@ class PostPdfFileView(View):
 import io
 
 from django.http import FileResponse
-from django.utils.html import strip_tags
+from django.utils.html import escape
 from django.utils.text import slugify
 from reportlab.lib.enums import TA_JUSTIFY
 from reportlab.lib.pagesizes import letter
@@ -140,8 +140,8 @@ class PDFFileDownloadView(View):
             canvas.append(Paragraph(post.title, styles["post_title"]))
             canvas.append(Spacer(1, 12))
 
-            # post content
-            content = strip_tags(post.content)
+            # post content, escaped because Paragraph reads it as markup
+            content = escape(post.plain_text).replace("\n", "<br/>")
             canvas.append(Paragraph(content, styles["Justify"]))
             canvas.append(Spacer(1, 12))
 